@@ -1,6 +1,21 @@
-from .game import init, run
+import sys
+
+from .profiling import profile, phase
 
 
 def main():
+    if '--profile-startup' in sys.argv:
+        sys.argv.remove('--profile-startup')
+        profile.enable()
+    with phase('imports'):
+        from .game import init, run
+        from . import music
     init()
-    run()
+    try:
+        run()
+    finally:
+        music.shutdown()
+
+
+if __name__ == '__main__':
+    main()
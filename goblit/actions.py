@@ -45,6 +45,14 @@ class SceneAction:
     def play(self, scene):
         """Subclasses should implement this to play the animation."""
 
+    def reset(self):
+        """Forget the state of any previous play, before playing again.
+
+        Actions may be skipped before they have been played, so this is
+        called on every action in a tree, not only on those that play.
+
+        """
+
     def done(self):
         """Called by play() to indicate the action has finished."""
         if self.on_finish:
@@ -86,6 +94,10 @@ class BaseMultiAction(SceneAction):
     def _can_skip(self):
         return all(hasattr(a, 'skip') for a in self.actions)
 
+    def reset(self):
+        for a in self.actions:
+            a.reset()
+
 
 class ActionChain(BaseMultiAction):
     """A sequence of actions.
@@ -102,6 +114,10 @@ class ActionChain(BaseMultiAction):
     def on_finish(self, a):
         self.next()
 
+    def reset(self):
+        super().reset()
+        self.current = 0
+
     def _skip(self, scene):
         """Skip all actions that have not yet been completed."""
         for a in self.actions[self.current:]:
@@ -128,6 +144,10 @@ class ParallelAction(BaseMultiAction):
         for a in self.actions:
             a.play(scene)
 
+    def reset(self):
+        super().reset()
+        self.waiting = set(self.actions)
+
     def _skip(self, scene):
         """Skip all actions that have not yet been completed."""
         for a in self.waiting:
@@ -205,6 +225,10 @@ class MoveTo(SceneAction):
             self.transition = None
             raise ScriptError("%s is not on set to move" % self.actor)
 
+    def reset(self):
+        self.cancel()
+        self.transition = None
+
     def cancel(self):
         """Stop moving right where we are.
 
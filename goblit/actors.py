@@ -1,8 +1,8 @@
 from math import sin, pi
+from functools import lru_cache
 import pygame
-from pygame.font import Font
 from .animations import Sequence, Frame, Animation, loop
-from .loaders import load_image, load_frames
+from .loaders import load_font
 from .geom import dist
 from .actions import Action
 from .errors import ScriptError
@@ -10,44 +10,44 @@ from .inventory import SceneItem
 
 
 def load_sequence(base, num, offset):
-    fs = []
-    for f in load_frames(base, num):
-        fs.append(Frame(f, offset))
-    return fs
+    return [
+        Frame('%s-%d' % (base, i), offset)
+        for i in range(1, num + 1)
+    ]
 
 
 GOBLIT = Animation({
     'default': Sequence([
-        Frame(load_image('goblit-standing'), (-18, -81))
+        Frame('goblit-standing', (-18, -81))
     ], loop),
     'walking': Sequence(
         load_sequence('goblit-walking', 4, (-46, -105)), loop),
     'catapulting': Sequence([
-        Frame(load_image('goblit-catapulting'), (-32, -83))
-    ] * 10, 'default'),
+        Frame('goblit-catapulting', (-32, -83), 10)
+    ], 'default'),
     'blushing': Sequence([
-        Frame(load_image('goblit-blushing'), (-18, -81))
-    ] * 30, 'default'),
+        Frame('goblit-blushing', (-18, -81), 30)
+    ], 'default'),
     'disgusted': Sequence([
-        Frame(load_image('goblit-disgust'), (-18, -81))
-    ] * 30, 'default'),
+        Frame('goblit-disgust', (-18, -81), 30)
+    ], 'default'),
     'look-back': Sequence([
-        Frame(load_image('goblit-back'), (-18, -81))
+        Frame('goblit-back', (-18, -81))
     ], loop),
     'summoning': Sequence([
-        Frame(load_image('goblit-summoning'), (-48, -81))
-    ] * 30, 'look-back'),
+        Frame('goblit-summoning', (-48, -81), 30)
+    ], 'look-back'),
 })
 
 TOX = Animation({
     'default': Sequence([
-        Frame(load_image('tox-standing'), (-31, -95))
+        Frame('tox-standing', (-31, -95))
     ], loop),
     'sitting-at-desk': Sequence([
-        Frame(load_image('tox-sitting-desk'), (-37, -99))
+        Frame('tox-sitting-desk', (-37, -99))
     ], loop),
     'sitting': Sequence([
-        Frame(load_image('tox-sitting'), (-41, -91))
+        Frame('tox-sitting', (-41, -91))
     ], loop),
     'walking': Sequence(
         load_sequence('tox-walking', 4, (-46, -105)), loop),
@@ -55,30 +55,30 @@ TOX = Animation({
 
 AMELIA = Animation({
     'default': Sequence([
-        Frame(load_image('amelia-standing'), (-21, -87))
+        Frame('amelia-standing', (-21, -87))
     ], loop),
     'angry': Sequence([
-        Frame(load_image('amelia-angry'), (-21, -87))
+        Frame('amelia-angry', (-21, -87))
     ], loop),
     'blushing': Sequence([
-        Frame(load_image('amelia-blushing'), (-21, -87))
-    ] * 30, 'default'),
+        Frame('amelia-blushing', (-21, -87), 30)
+    ], 'default'),
     'disgusted': Sequence([
-        Frame(load_image('amelia-disgust'), (-21, -87))
-    ] * 30, 'default'),
+        Frame('amelia-disgust', (-21, -87), 30)
+    ], 'default'),
     'walking': Sequence(
         load_sequence('amelia-walking', 4, (-46, -105)), loop),
     'summoning': Sequence([
-        Frame(load_image('amelia-summoning'), (-21, -87))
-    ] * 30, 'look-back'),
+        Frame('amelia-summoning', (-21, -87), 30)
+    ], 'look-back'),
     'look-back': Sequence([
-        Frame(load_image('amelia-look-back'), (-22, -87))
+        Frame('amelia-look-back', (-22, -87))
     ], loop),
 })
 
 RALPH = Animation({
     'default': Sequence([
-        Frame(load_image('ralph-standing'), (-18, -82))
+        Frame('ralph-standing', (-18, -82))
     ], loop),
     'walking': Sequence(
         load_sequence('ralph-walking', 4, (-46, -105)), loop),
@@ -86,7 +86,7 @@ RALPH = Animation({
 
 JOAN = Animation({
     'default': Sequence([
-        Frame(load_image('joan-standing'), (-22, -98))
+        Frame('joan-standing', (-22, -98))
     ], loop),
     'walking': Sequence(
         load_sequence('joan-walking', 4, (-46, -105)), loop),
@@ -95,19 +95,19 @@ JOAN = Animation({
 
 CAULDRON = Animation({
     'default': Sequence([
-        Frame(load_image('cauldron'), (-43, -95))
+        Frame('cauldron', (-43, -95))
     ], loop),
     'full': Sequence([
-        Frame(load_image('cauldron-full'), (-43, -95))
+        Frame('cauldron-full', (-43, -95))
     ], loop),
     'bubbling': Sequence([
-        Frame(load_image('cauldron-bubbling'), (-43, -95))
+        Frame('cauldron-bubbling', (-43, -95))
     ], loop),
     'blue': Sequence([
-        Frame(load_image('cauldron-blue'), (-43, -95))
+        Frame('cauldron-blue', (-43, -95))
     ], loop),
     'ready': Sequence([
-        Frame(load_image('cauldron-ready'), (-43, -95))
+        Frame('cauldron-ready', (-43, -95))
     ], loop),
 })
 
@@ -115,22 +115,22 @@ CAULDRON = Animation({
 PENTAGRAM_POS = (-128, -66)
 PENTAGRAM = Animation({
     'default': Sequence([
-        Frame(load_image('pentagram'), PENTAGRAM_POS)
+        Frame('pentagram', PENTAGRAM_POS)
     ], loop),
     'crystals': Sequence([
-        Frame(load_image('pentagram-crystals'), PENTAGRAM_POS)
+        Frame('pentagram-crystals', PENTAGRAM_POS)
     ], loop),
     'candles': Sequence([
-        Frame(load_image('pentagram-candles'), PENTAGRAM_POS)
+        Frame('pentagram-candles', PENTAGRAM_POS)
     ], loop),
     'candles-crystals': Sequence([
-        Frame(load_image('pentagram-candles-crystals'), PENTAGRAM_POS)
+        Frame('pentagram-candles-crystals', PENTAGRAM_POS)
     ], loop),
     'candles-lit': Sequence([
-        Frame(load_image('pentagram-candles-lit'), PENTAGRAM_POS)
+        Frame('pentagram-candles-lit', PENTAGRAM_POS)
     ], loop),
     'ready': Sequence([
-        Frame(load_image('pentagram-candles-crystals-lit'), PENTAGRAM_POS)
+        Frame('pentagram-candles-crystals-lit', PENTAGRAM_POS)
     ], loop),
 })
 
@@ -139,8 +139,39 @@ KNIFE = Animation({
         load_sequence('knife', 12, (-18, -12)), loop),
 })
 
-FONT = (Font('fonts/RosesareFF0000.ttf', 16), False)
-BIG_FONT = (Font('fonts/LiberationSerif-Bold.ttf', 100), True)
+# Fonts, as (path, size, antialias) tuples
+FONT = ('fonts/RosesareFF0000.ttf', 16, False)
+BIG_FONT = ('fonts/LiberationSerif-Bold.ttf', 100, True)
+
+
+@lru_cache(maxsize=256)
+def render_text(text, color, font=FONT, outline=1):
+    """Render text, with a black outline if outline is non-zero.
+
+    font is a (path, size, antialias) tuple.
+
+    Surfaces are cached, and shared between all bubbles showing the same
+    text, so they must not be modified. Call render_text.cache_info() to
+    get the cache hit rate.
+
+    """
+    path, size, antialias = font
+    font = load_font(path, size)
+    base = font.render(text, antialias, color)
+    if not outline:
+        return base
+    black = font.render(text, antialias, (0, 0, 0))
+
+    o = outline
+    o2 = o * 2
+    w, h = base.get_size()
+    surf = pygame.Surface((w + o2, h + o2), pygame.SRCALPHA)
+
+    for off in [(0, 0), (0, o2), (o2, 0), (o2, o2)]:
+        surf.blit(black, off)
+
+    surf.blit(base, (o, o))
+    return surf
 
 
 class FontBubble:
@@ -160,22 +191,9 @@ class FontBubble:
         self._build_surf()
 
     def _build_surf(self):
-        font, antialias = self.font
-        base = font.render(self.text, antialias, self.color)
-        if not self.outline:
-            self.surf = base
-            return
-        black = font.render(self.text, antialias, (0, 0, 0))
-
-        o = self.outline
-        o2 = o * 2
-        w, h = base.get_size()
-        self.surf = pygame.Surface((w + o2, h + o2), pygame.SRCALPHA)
-
-        for off in [(0, 0), (0, o2), (o2, 0), (o2, o2)]:
-            self.surf.blit(black, off)
-
-        self.surf.blit(base, (o, o))
+        self.surf = render_text(
+            self.text, tuple(self.color), self.font, self.outline
+        )
 
     def pos_center(self):
         x, y = self.pos
@@ -212,6 +230,14 @@ class SpeechBubble(FontBubble):
 ACTORS = []
 
 
+def preload(actor_names):
+    """Load the sprites for the named actors now, rather than on first use."""
+    actor_names = set(actor_names)
+    for cls in ACTORS:
+        if cls.NAME in actor_names:
+            cls.SPRITE.preload()
+
+
 class ActorMeta(type):
     def __new__(cls, name, bases, dict):
         stage_directions = {}
@@ -249,10 +275,7 @@ class Actor(metaclass=ActorMeta):
         self.sprite = None
         self.visible = False
         self.name = self.NAME
-
-        frame = self.SPRITE.sequences['default'].frames[0]
-        r = frame.sprite.get_rect()
-        self._bounds = r.move(*frame.offset)
+        self._bounds = None
 
     def show(self, pos=None, dir='right', initial='default'):
         self.visible = True
@@ -261,7 +284,7 @@ class Actor(metaclass=ActorMeta):
             self.sprite.dir = 'right'
             self.sprite.play(initial)
         else:
-            self.sprite.pos = pos
+            self.pos = pos
             self.sprite.dir = dir
             self.sprite.play(initial)
 
@@ -294,6 +317,7 @@ class Actor(metaclass=ActorMeta):
     def pos(self, pos):
         if self.sprite:
             self.sprite.pos = pos
+            self.scene.objects.reposition(self)
 
     def floor_pos(self):
         return self.pos
@@ -305,6 +329,11 @@ class Actor(metaclass=ActorMeta):
 
     @property
     def bounds(self):
+        if self._bounds is None:
+            # Loading the sprite is deferred until it is first needed
+            frame = self.SPRITE.sequences['default'].frames[0]
+            r = frame.sprite.get_rect()
+            self._bounds = r.move(*frame.offset)
         return self._bounds.move(*self.sprite.pos)
 
     def draw(self, screen):
@@ -318,7 +347,7 @@ class Actor(metaclass=ActorMeta):
         if not self.visible:
             self.scene.spawn_actor(self.NAME, navpoint)
         else:
-            self.sprite.pos = navpoint
+            self.pos = navpoint
 
     @stage_direction('is gone')
     def unspawn(self):
@@ -724,6 +753,7 @@ class Goblit(NPC):
         x, y = c.pos
         fc = self.scene.spawn_object_near_navpoint('FALLEN CHANDELIER', (x - 20, y + 20), 'CENTRE STAGE')
         fc.z = p.z + 1
+        self.scene.objects.reposition(fc)
         del self.chandelier_drop
 
     def draw(self, screen):
@@ -781,10 +811,9 @@ class Joan(NPC):
 
 
 def make_floating_sequence(imname, xoff, yoff):
-    im = load_image(imname)
     heights = (round(10 * sin(0.1 * pi * t)) for t in range(20))
     return Sequence(
-        [Frame(im, (xoff, yoff + h)) for h in heights],
+        [Frame(imname, (xoff, yoff + h)) for h in heights],
         loop
     )
 
@@ -1,58 +1,185 @@
+from bisect import bisect_right
 from collections import namedtuple
+from itertools import accumulate
+from weakref import WeakSet
 from pygame.transform import flip
 
 from . import clock
+from .loaders import load_image, surface_bytes
 
 DEFAULT_FRAME_RATE = 15
 
 
-# A sprite and the (x, y) position at which it should be drawn, relative
-# to the animation instance
-Frame = namedtuple('Frame', 'sprite offset')
+class Frame(namedtuple('BaseFrame', 'image offset hold')):
+    """A sprite and the (x, y) position at which it should be drawn,
+    relative to the animation instance, plus the number of frame ticks for
+    which it is held (default 1).
+
+    image is usually the name of an image, which is only loaded when the
+    sprite is first needed, but may also be a Surface.
+
+    """
+    __slots__ = ()
+
+    @property
+    def sprite(self):
+        if isinstance(self.image, str):
+            return load_image(self.image)
+        return self.image
+
+Frame.__new__.__defaults__ = (1,)
 
 # Sentinel value to indicate looping until told to stop, rather than
 # switching to a different animation
 loop = object()
 
-# A list of of frames plus the name of the next sequence to play when the
-# animation ends.
-#
-# Set next_sequence to ``loop`` to make the animation loop forever.
-Sequence = namedtuple('Sequence', 'frames next_sequence')
+
+class Sequence:
+    """A list of of frames plus the name of the next sequence to play when
+    the animation ends.
+
+    Set next_sequence to ``loop`` to make the animation loop forever.
+
+    Frames are stored run-length encoded: runs of the same sprite at the same
+    offset are merged into a single frame with a longer hold, so
+    ``[Frame(im, offset)] * 30`` is equivalent to ``[Frame(im, offset, 30)]``.
+
+    """
+    def __init__(self, frames, next_sequence):
+        self.frames = []
+        for f in frames:
+            if self.frames:
+                last = self.frames[-1]
+                if last.image == f.image and last.offset == f.offset:
+                    self.frames[-1] = last._replace(hold=last.hold + f.hold)
+                    continue
+            self.frames.append(f)
+        self.next_sequence = next_sequence
+
+        # The tick at which each frame ends
+        self.ends = list(accumulate(f.hold for f in self.frames))
+
+    @property
+    def length(self):
+        """The total length of the sequence in frame ticks."""
+        return self.ends[-1]
+
+    def frame_at(self, tick):
+        """Get the frame that is showing at the given tick."""
+        return self.frames[bisect_right(self.ends, tick)]
 
 
 class Animation:
+    # All animations, for reporting on cache sizes
+    all = WeakSet()
+
     def __init__(self, sequences, frame_rate=DEFAULT_FRAME_RATE):
         self.sequences = sequences
         self.frame_rate = frame_rate
 
+        # Horizontally mirrored sprites and frames, built on first use
+        self._mirrored_sprites = {}
+        self._mirrored_frames = {}
+        self.all.add(self)
+
     def create_instance(self, pos=(0, 0)):
         return AnimationInstance(self, pos)
 
+    def images(self):
+        """Get the names of all the images used by this animation."""
+        return {
+            f.image
+            for seq in self.sequences.values()
+            for f in seq.frames
+            if isinstance(f.image, str)
+        }
+
+    def preload(self):
+        """Load all the images used by this animation now."""
+        for seq in self.sequences.values():
+            for f in seq.frames:
+                f.sprite
+
+    def mirrored(self, frame):
+        """Get the horizontally mirrored version of frame.
+
+        The sprite is flipped, but drawn at the same offset. The result is
+        cached, so this is cheap to call every frame.
+
+        """
+        try:
+            return self._mirrored_frames[frame]
+        except KeyError:
+            pass
+        sprite = self._mirrored_sprites.get(frame.image)
+        if sprite is None:
+            sprite = flip(frame.sprite, True, False)
+            self._mirrored_sprites[frame.image] = sprite
+        m = self._mirrored_frames[frame] = frame._replace(image=sprite)
+        return m
+
+    def mirror_cache_bytes(self):
+        """Get the memory used by mirrored sprites for this animation."""
+        return sum(surface_bytes(s) for s in self._mirrored_sprites.values())
+
+
+def mirror_cache_bytes():
+    """Get the memory used by mirrored sprites across all animations."""
+    return sum(a.mirror_cache_bytes() for a in Animation.all)
+
 
 class AnimationInstance:
+    """A playing animation.
+
+    Rather than being advanced by the clock, the current frame is sampled
+    from the time elapsed since the current sequence started. Transitions to
+    ``next_sequence`` are resolved lazily, when the frame is next needed.
+
+    """
     def __init__(self, animation, pos=(0, 0)):
         self.animation = animation
         self.pos = pos
         self.dir = dir
         self.play('default')  # Start default sequence
-        clock.schedule_interval(self.next_frame, 1 / self.animation.frame_rate)
 
     def play(self, sequence_name):
         """Start playing the given sequence at the beginning."""
-        self.playing = sequence_name
-        self.currentframe = 0
+        self._playing = sequence_name
         self.sequence = self.animation.sequences[sequence_name]
+        self.start = clock.clock.t
 
-    def next_frame(self):
-        """Called by the clock to increment the frame number."""
-        self.currentframe += 1
-        if self.currentframe >= len(self.sequence.frames):
+    def _resolve(self):
+        """Work out the current frame tick from the clock.
+
+        Any sequences that have finished in the meantime are replaced by
+        their next sequence.
+
+        """
+        frame_rate = self.animation.frame_rate
+        while True:
+            length = self.sequence.length
+            if len(self.sequence.frames) == 1 and \
+                    self.sequence.next_sequence is loop:
+                return 0  # Static sequences never change
+            tick = int((clock.clock.t - self.start) * frame_rate)
+            if tick < length:
+                return tick
             next = self.sequence.next_sequence
             if next is loop:
-                self.currentframe = 0
-            else:
-                self.play(next)
+                return tick % length
+            self.start += length / frame_rate
+            self._playing = next
+            self.sequence = self.animation.sequences[next]
+
+    @property
+    def playing(self):
+        """The name of the sequence that is currently playing."""
+        self._resolve()
+        return self._playing
+
+    @property
+    def currentframe(self):
+        return self._resolve()
 
     def draw(self, screen):
         """Draw the animation at coordinates given by self.pos.
@@ -60,10 +187,10 @@ class AnimationInstance:
         The current frame will be drawn at its corresponding offset.
 
         """
-        frame = self.sequence.frames[self.currentframe]
+        tick = self._resolve()
+        frame = self.sequence.frame_at(tick)
+        if self.dir == 'right':
+            frame = self.animation.mirrored(frame)
         ox, oy = frame.offset
         x, y = self.pos
-        sprite = frame.sprite
-        if self.dir == 'right':
-            sprite = flip(sprite, True, False)
-        screen.blit(sprite, (x + ox, y + oy))
+        screen.blit(frame.sprite, (x + ox, y + oy))
@@ -0,0 +1,229 @@
+"""Bake the game's assets into a pack that can be loaded without decoding.
+
+Run this with::
+
+    python -m goblit.bake
+
+This writes data/assets.pack, which contains every image in graphics/,
+already decoded into the display's pixel format, as well as the routing grid,
+hit map and navigation points. Sprites and item icons are packed together
+into a few atlas pages, and loaded as subsurfaces of those. At runtime the
+pack is memory-mapped (see loaders.AssetPack). Entries are checked against
+their source files, so anything that has been edited since the pack was
+baked is loaded from the loose file instead; re-run the bake to bring the
+pack up to date.
+
+"""
+import os
+import json
+import time
+import pygame
+
+from .loaders import (
+    IMAGE_DIR, PACK_PATH, PACK_MAGIC, PACK_VERSION, PACK_HEADER,
+    PACK_PIXEL_FORMAT, pack_align, source_stamp, classify_alpha
+)
+from .routing import Grid, PLAN_DIR, SUBDIVIDE
+from .hitmap import HITMAP_PATH, read_regions
+from .navpoints import NAVPOINT_PATH, read_points
+
+
+# The data files that the scene loads
+GRIDS = ['floor']
+HITMAPS = ['hit-areas']
+NAVPOINTS = ['navigation-points']
+
+# Images no bigger than this in either dimension are packed into atlases;
+# larger ones, like the room backgrounds, are stored on their own
+ATLAS_MAX_SPRITE = 256
+
+# The atlas page widths to try; we keep whichever wastes least space
+ATLAS_WIDTHS = [512, 1024, 2048]
+ATLAS_MAX_HEIGHT = 2048
+
+
+def shelf_pack(sizes, width, max_height=ATLAS_MAX_HEIGHT):
+    """Pack rectangles of the given sizes into pages of the given width.
+
+    Rectangles are placed tallest first, left to right along horizontal
+    shelves; when a shelf is full a new one is started below it, and when a
+    page is full a new page is started.
+
+    Return a list of (page, x, y) placements, in the order of sizes, and a
+    list of the heights of the pages.
+
+    """
+    order = sorted(
+        range(len(sizes)),
+        key=lambda i: (sizes[i][1], sizes[i][0]),
+        reverse=True
+    )
+    placements = [None] * len(sizes)
+    heights = [0]
+    x = y = shelf_h = 0
+    for i in order:
+        w, h = sizes[i]
+        if w > width:
+            raise ValueError(
+                "%dx%d does not fit a page %d wide" % (w, h, width)
+            )
+        if x + w > width:
+            x = 0
+            y += shelf_h
+            shelf_h = 0
+        if y + h > max_height:
+            heights.append(0)
+            x = y = shelf_h = 0
+        placements[i] = (len(heights) - 1, x, y)
+        x += w
+        shelf_h = max(shelf_h, h)
+        heights[-1] = max(heights[-1], y + h)
+    return placements, heights
+
+
+def bake_atlas(sprites, alpha, first_page=0):
+    """Pack sprites into atlas pages.
+
+    sprites is a list of (name, path, size, data) tuples for images with the
+    same kind of alpha, so that each page can be prepared for the display as
+    a whole. Return a list of entries for the sprites and the pages.
+
+    """
+    sizes = [size for name, path, size, data in sprites]
+    width, (placements, heights) = min(
+        ((w, shelf_pack(sizes, w)) for w in ATLAS_WIDTHS),
+        key=lambda packing: packing[0] * sum(packing[1][1])
+    )
+
+    # Leave the unused space on opaque pages opaque, so that they are still
+    # classified as opaque at runtime
+    background = b'\0\0\0\xff' if alpha == 'opaque' else b'\0\0\0\0'
+    pages = [bytearray(background * (width * h)) for h in heights]
+    entries = []
+    for (name, path, (w, h), data), (page, x, y) in zip(sprites, placements):
+        pixels = pages[page]
+        for row in range(h):
+            start = ((y + row) * width + x) * 4
+            pixels[start:start + w * 4] = data[row * w * 4:(row + 1) * w * 4]
+        entry = {
+            'size': (w, h),
+            'page': first_page + page,
+            'rect': (x, y, w, h)
+        }
+        entries.append(('image', name, path, entry, None))
+
+    for i, (h, pixels) in enumerate(zip(heights, pages)):
+        used = sum(
+            w * h for (w, h), (page, x, y) in zip(sizes, placements)
+            if page == i
+        )
+        entry = {'size': (width, h), 'used': used, 'alpha': alpha}
+        entries.append(('atlas', str(first_page + i), None, entry, pixels))
+    return entries
+
+
+def bake_images():
+    """Decode each image in IMAGE_DIR.
+
+    Small images are packed into atlas pages; their entries refer to a rect
+    on a page rather than having a blob of their own.
+
+    """
+    sprites = {}
+    for filename in sorted(os.listdir(IMAGE_DIR)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.png':
+            continue
+        path = os.path.join(IMAGE_DIR, filename)
+        surf = pygame.image.load(path)
+        w, h = size = surf.get_size()
+        data = pygame.image.tostring(surf, PACK_PIXEL_FORMAT)
+        if max(w, h) <= ATLAS_MAX_SPRITE:
+            alpha = classify_alpha(surf)
+            sprites.setdefault(alpha, []).append((name, path, size, data))
+        else:
+            yield 'image', name, path, {'size': size}, data
+
+    pages = 0
+    for alpha, group in sorted(sprites.items()):
+        entries = bake_atlas(group, alpha, pages)
+        pages += sum(1 for kind, *_ in entries if kind == 'atlas')
+        yield from entries
+
+
+def bake_data():
+    """Compute the routing grids and parse the SVG files."""
+    for name in GRIDS:
+        path = os.path.join(PLAN_DIR, name + '.png')
+        surf = Grid.subsample(pygame.image.load(path), SUBDIVIDE)
+        entry = {'size': surf.get_size(), 'subdivide': SUBDIVIDE}
+        yield 'grid', name, path, entry, pygame.image.tostring(surf, 'RGB')
+
+    for name in HITMAPS:
+        path = os.path.join(HITMAP_PATH, name + '.svg')
+        regions = {id: tuple(r) for id, r in read_regions(path).items()}
+        yield 'hitmap', name, path, {'regions': regions}, None
+
+    for name in NAVPOINTS:
+        path = os.path.join(NAVPOINT_PATH, name + '.svg')
+        yield 'navpoints', name, path, {'points': read_points(path)}, None
+
+
+def write_pack(entries, path=PACK_PATH):
+    """Write a pack of the given entries.
+
+    entries is an iterable of (kind, name, source, entry, data) tuples, where
+    entry is a dict of metadata for the index and data is the blob to store,
+    or None. source is the file the entry was baked from, if any.
+
+    """
+    index = {}
+    blobs = []
+    offset = 0
+    for kind, name, source, entry, data in entries:
+        if source:
+            entry['source'] = source_stamp(source)
+        if data is not None:
+            entry['offset'] = offset
+            entry['length'] = len(data)
+            blobs.append((offset, data))
+            offset = pack_align(offset + len(data))
+        index.setdefault(kind, {})[name] = entry
+
+    index_bytes = json.dumps(index, separators=(',', ':')).encode('utf8')
+    base = pack_align(PACK_HEADER.size + len(index_bytes))
+
+    # Write to a temporary file so that a running game never sees a
+    # half-written pack
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        for offset, data in blobs:
+            f.seek(base + offset)
+            f.write(data)
+    os.replace(tmp, path)
+    return index
+
+
+def main():
+    start = time.perf_counter()
+    index = write_pack(list(bake_images()) + list(bake_data()))
+    t = time.perf_counter() - start
+    for kind, entries in index.items():
+        print('%5d %s' % (len(entries), kind))
+    for name, page in index['atlas'].items():
+        w, h = page['size']
+        sprites = sum(
+            1 for e in index['image'].values() if e.get('page') == int(name)
+        )
+        print('atlas page %s: %dx%d, %d %s sprites, %.0f%% occupied' % (
+            name, w, h, sprites, page['alpha'], 100 * page['used'] / (w * h)
+        ))
+    print('Baked %s (%.1fMB) in %.1fs' % (
+        PACK_PATH, os.path.getsize(PACK_PATH) / 1048576, t
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,20 @@
 """Utilities for binding extra directives and stage directions."""
 import re
 from .errors import ScriptError
-from functools import partial
+from .actions import ParallelAction
 from collections import OrderedDict
 
 
 # A list of all registered stage directions
 STAGE_DIRECTIONS = []
 
+# All the patterns in STAGE_DIRECTIONS combined into one regex, and a map
+# from its groups to bindings; built on first use (see dispatch_regex())
+_dispatch = None
+
+# Stage directions that have already been resolved
+_resolved = {}
+
 
 def make_regex(pattern):
     pattern = pattern.strip()
@@ -24,14 +31,48 @@ def stagedirection(pattern):
 
     """
     def decorator(func):
-        STAGE_DIRECTIONS.append((
-            make_regex(pattern),
-            func
-        ))
+        global _dispatch
+        regex = make_regex(pattern)
+        required_args = func.__code__.co_argcount
+        required_args -= 1  # All stage direction bindings take 'scene'
+        if required_args != regex.groups:
+            raise ScriptError(
+                "Incorrect number of patterns for binding of %s (found %d, function takes %d)" % (
+                    func.__qualname__, regex.groups, required_args
+                )
+            )
+        STAGE_DIRECTIONS.append((regex, func))
+        _dispatch = None
+        _resolved.clear()
         return func
     return decorator
 
 
+def dispatch_regex():
+    """Get a regex that matches any registered stage direction.
+
+    Each pattern is wrapped in a group of its own, tried in the order they
+    were registered. After a match, lastindex is the group of the pattern
+    that matched, and the pattern's own groups follow it.
+
+    Return the regex and a dict mapping the index of each pattern's group
+    to the index of the binding in STAGE_DIRECTIONS and the slice of groups
+    holding its parameters.
+
+    """
+    global _dispatch
+    if _dispatch is None:
+        alternatives = []
+        groups = {}
+        group = 1
+        for i, (pat, func) in enumerate(STAGE_DIRECTIONS):
+            alternatives.append('(%s)' % pat.pattern)
+            groups[group] = i, slice(group, group + pat.groups)
+            group += 1 + pat.groups
+        _dispatch = re.compile('|'.join(alternatives)), groups
+    return _dispatch
+
+
 # Missing bindings are accumulated here
 # So that we can print them all at once
 SUGGESTED_BINDINGS = OrderedDict()
@@ -65,6 +106,7 @@ def {func}({args}):
 
 
 def print_suggestions():
+    """Print code for the bindings found missing since the last call."""
     if not SUGGESTED_BINDINGS:
         return
     print("\n\nSome stage direction bindings were missing.\n")
@@ -75,22 +117,167 @@ def print_suggestions():
     )
     for pattern, code in SUGGESTED_BINDINGS.items():
         print(code)
+    SUGGESTED_BINDINGS.clear()
 
 
-def lookup_stagedirection(expression):
-    """Look up a stage direction, returning a callable."""
-    for pat, func in STAGE_DIRECTIONS:
-        mo = pat.match(expression)
-        if mo:
-            params = mo.groups()
-            required_args = func.__code__.co_argcount
-            required_args -= 1  # All stage direction bindings take 'scene'
-            if required_args != len(params):
-                raise ScriptError(
-                    "Incorrect number of patterns for binding of %s (found %d, function takes %d)" % (
-                        func.__qualname__, len(params), required_args
-                    )
-                )
-            return lambda scene: func(scene, *params)
+def resolve_stagedirection(expression):
+    """Find the binding for a stage direction.
+
+    Return the index of the binding in STAGE_DIRECTIONS and the parameters
+    to pass to it. Unlike the callable returned by lookup_stagedirection(),
+    these can be cached.
+
+    """
+    try:
+        return _resolved[expression]
+    except KeyError:
+        pass
+    regex, groups = dispatch_regex()
+    mo = regex.match(expression)
+    if mo:
+        i, params = groups[mo.lastindex]
+        resolved = _resolved[expression] = i, mo.groups()[params]
+        return resolved
     suggest_binding(expression)
     raise ScriptError("No stage direction found matching %r." % expression)
+
+
+class Binding:
+    """A stage direction bound to the function that implements it.
+
+    Calling this with the scene gets the SceneAction to play, or None. The
+    action is built the first time, and then kept as a template that is
+    reset and played again whenever the stage direction is. So the function
+    should build its action from its parameters alone, leaving anything that
+    depends on the state of the scene to the action's play(). Functions that
+    act on the scene directly and return None are called every time.
+
+    """
+    __slots__ = ('func', 'params', 'template')
+
+    def __init__(self, func, params=()):
+        self.func = func
+        self.params = params
+        self.template = None
+
+    def __call__(self, scene):
+        if self.template is None:
+            self.template = self.func(scene, *self.params)
+        else:
+            self.template.reset()
+        return self.template
+
+
+class ParallelBinding:
+    """Several bindings, whose actions are played in parallel.
+
+    The ParallelAction is kept as a template if all of the bindings
+    returned actions; otherwise the bindings that act directly must be
+    called again, so it is built each time.
+
+    """
+    __slots__ = ('bindings', 'template')
+
+    def __init__(self, bindings):
+        self.bindings = bindings
+        self.template = None
+
+    def __call__(self, scene):
+        if self.template is not None:
+            self.template.reset()
+            return self.template
+        results = [b(scene) for b in self.bindings]
+        actions = [a for a in results if a is not None]
+        if not actions:
+            return None
+        if len(actions) == 1:
+            action = actions[0]
+        else:
+            action = ParallelAction(*actions)
+        if len(actions) == len(results):
+            self.template = action
+        return action
+
+
+def bind_stagedirection(index, params):
+    """Get a Binding for a binding found by resolve_stagedirection()."""
+    return Binding(STAGE_DIRECTIONS[index][1], params)
+
+
+def lookup_stagedirection(expression):
+    """Look up a stage direction, returning a callable."""
+    return bind_stagedirection(*resolve_stagedirection(expression))
+
+
+def fingerprint():
+    """Get a string that identifies the registered stage directions.
+
+    If this changes, cached results of resolve_stagedirection() are invalid.
+
+    """
+    return repr([
+        (pat.pattern, func.__module__, func.__qualname__,
+         func.__code__.co_argcount)
+        for pat, func in STAGE_DIRECTIONS
+    ])
+
+
+if __name__ == '__main__':
+    # Measure what it costs each time the stage directions in the script
+    # play: calling their functions to build a fresh action every time,
+    # against reusing the templates kept by Binding
+    import time
+    import tracemalloc
+    from . import scripts
+    from . import stagedirections  # noqa: registers the bindings
+
+    # The bindings are registered with the module, not with __main__
+    from . import binding
+
+    class StubScene:
+        """Enough of a scene for the bindings that act on it directly."""
+        def __getattr__(self, name):
+            return lambda *args: self
+
+    scene = StubScene()
+    script = scripts.parse_file('script')
+    resolved = []
+    for node in scripts.walk(script.contents):
+        if isinstance(node, scripts.StageDirection):
+            for d in node.directions:
+                try:
+                    i, params = binding.resolve_stagedirection(d)
+                    binding.STAGE_DIRECTIONS[i][1](scene, *params)
+                except Exception:
+                    continue  # Unbound or unimplemented
+                resolved.append((i, params))
+
+    def fresh():
+        return [
+            binding.STAGE_DIRECTIONS[i][1](scene, *params)
+            for i, params in resolved
+        ]
+
+    bindings = [
+        binding.bind_stagedirection(i, params) for i, params in resolved
+    ]
+
+    def templates():
+        return [b(scene) for b in bindings]
+
+    rounds = 200
+    for func in (fresh, templates):
+        func()  # Build the templates, and warm up
+        tracemalloc.start()
+        results = [func() for _ in range(rounds)]
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del results
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        t = time.perf_counter() - start
+        n = rounds * len(resolved)
+        print("%-10s %7.1f bytes %6.2fus per stage direction" % (
+            func.__name__, allocated / n, t / n * 1e6
+        ))
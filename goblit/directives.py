@@ -1,10 +1,100 @@
 import re
 import random
+from collections import namedtuple
 from .errors import ScriptError
 from .scene import player, scene, directive
 from .dialogue import DialogueChoice, AllDialogueChoice
-from .inventory import inventory
-from .music import play_music
+from .inventory import inventory, Item
+from .actors import ACTORS
+from . import items  # noqa: defines items the script refers to
+from .music import play_music, prefetch_music
+
+
+RENAME_RE = re.compile(r'^([A-Z ]+?)\s*->\s*([A-Z ]+)$')
+CRAFT_RE = re.compile(r'^([A-Z +]+?)\s*->\s*([A-Z +]+)$')
+
+Rename = namedtuple('Rename', 'current new')
+Craft = namedtuple('Craft', 'inputs outputs')
+
+# Functions that parse the data of a directive into its arguments, by name
+PARSERS = {}
+
+
+def parser(name):
+    """Register a function to parse the data of the named directive."""
+    def decorator(func):
+        PARSERS[name] = func
+        return func
+    return decorator
+
+
+def prepare(directive):
+    """Parse the arguments of a directive ahead of time.
+
+    Errors are printed, rather than raised; the directive raises them
+    again if it is played.
+
+    """
+    parse = PARSERS.get(directive.name)
+    if parse:
+        try:
+            directive.args = parse(directive.data)
+        except ScriptError as e:
+            print(e)
+
+
+def get_args(directive):
+    """Get the arguments of a directive, parsing them if need be."""
+    if directive.args is None:
+        directive.args = PARSERS[directive.name](directive.data)
+    return directive.args
+
+
+def check_item(name):
+    if not Item.exists(name):
+        raise ScriptError("No such item %s" % name)
+    return name
+
+
+def check_object(name):
+    """Check that name could be an object in the scene."""
+    if any(cls.NAME == name for cls in ACTORS) or Item.exists(name):
+        return name
+    if scene and scene.hitmap and name in scene.hitmap.regions:
+        return name
+    raise ScriptError("No such object %r" % name)
+
+
+@parser('rename')
+def parse_rename(data):
+    mo = RENAME_RE.match(data)
+    if not mo:
+        raise ScriptError("Couldn't parse rename directive %r" % data)
+    current, new = mo.groups()
+    return Rename(check_object(current), new)
+
+
+@parser('gain')
+@parser('lose')
+def parse_item(data):
+    return check_item(data)
+
+
+@parser('craft')
+def parse_craft(data):
+    mo = CRAFT_RE.match(data)
+    if not mo:
+        raise ScriptError("Couldn't parse craft directive %r" % data)
+
+    inputs, outputs = (
+        tuple(check_item(i.strip()) for i in g.split('+') if i.strip())
+        for g in mo.groups()
+    )
+    if not inputs:
+        raise ScriptError("No inputs for craft directive %r" % data)
+    if not outputs:
+        raise ScriptError("No outputs for craft directive %r" % data)
+    return Craft(inputs, outputs)
 
 
 @directive
@@ -30,11 +120,9 @@ def directive_unbind(directive):
 
 @directive
 def directive_rename(directive):
-    mo = re.match(r'^([A-Z ]+?)\s*->\s*([A-Z ]+)$', directive.data)
-    if not mo:
-        raise ScriptError("Couldn't parse rename directive %r" % directive.data)
+    current, new = get_args(directive)
     try:
-        scene.rename(*mo.groups())
+        scene.rename(current, new)
     except KeyError as e:
         raise ScriptError("No such object %r" % e.args[0])
 
@@ -42,30 +130,13 @@ def directive_rename(directive):
 @directive
 def directive_gain(directive):
     """Gain an item."""
-    try:
-        inventory.gain(directive.data)
-    except KeyError:
-        raise ScriptError("No such item %s" % directive.data)
+    inventory.gain(get_args(directive))
 
 
 @directive
 def directive_craft(directive):
     """Craft an item from others."""
-    mo = re.match(r'^([A-Z +]+?)\s*->\s*([A-Z +]+)$', directive.data)
-    if not mo:
-        raise ScriptError(
-            "Couldn't parse craft directive %r" % directive.data)
-
-    inputs, outputs = (
-        [item.strip() for item in g.split('+') if item.strip()]
-        for g in mo.groups()
-    )
-    if not inputs:
-        raise ScriptError(
-            "No inputs for craft directive %r" % directive.data)
-    if not outputs:
-        raise ScriptError(
-            "No outputs for craft directive %r" % directive.data)
+    inputs, outputs = get_args(directive)
     for i in inputs:
         try:
             inventory.lose(i)
@@ -78,12 +149,11 @@ def directive_craft(directive):
 @directive
 def directive_lose(directive):
     """Lose an item."""
+    item = get_args(directive)
     try:
-        inventory.lose(directive.data)
-    except KeyError:
-        raise ScriptError("No such item %s" % directive.data)
+        inventory.lose(item)
     except ValueError:
-        raise ScriptError("Player does not have %s" % directive.data)
+        raise ScriptError("Player does not have %s" % item)
 
 
 @directive
@@ -115,9 +185,7 @@ def directive_random(directive):
             GOBLIT: ...then that.
 
     """
-    from .scripts import Script
-    s = Script([random.choice(directive.contents)])
-    player.play_subscript(s)
+    player.play_instruction(random.choice(directive.contents))
 
 
 def directive_choose_any(directive):
@@ -141,6 +209,9 @@ def directive_music(directive):
         import traceback
         print("Couldn't play music", directive.data)
         traceback.print_exc()
+    upcoming = player.upcoming_music()
+    if upcoming:
+        prefetch_music(upcoming)
 
 
 @directive
@@ -0,0 +1,157 @@
+"""A list of scene objects that is kept in z-order.
+
+Rather than sorting all the objects in the scene every frame, objects are
+inserted at the right place when they are spawned, and moved only when their
+z-index changes (which for actors means when they move up or down the
+screen).
+
+"""
+from bisect import bisect_left, bisect_right
+
+
+class DisplayList:
+    """A list of objects, sorted by their z attribute.
+
+    Objects with equal z-indexes are kept in the order they were added.
+
+    If an object's z-index changes, reposition() must be called to move it
+    to its new place in the list.
+
+    """
+    def __init__(self, objects=()):
+        self._keys = []
+        self._objects = []
+        self._z = {}  # z-index of each object, by id, as last seen
+        self._count = {}  # number of entries for each object, by id
+        for o in objects:
+            self.append(o)
+
+    def __iter__(self):
+        return iter(self._objects)
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, obj):
+        return id(obj) in self._count
+
+    def __repr__(self):
+        return 'DisplayList(%r)' % self._objects
+
+    def append(self, obj):
+        """Add an object, inserting it in z-order."""
+        k = id(obj)
+        if k in self._count:
+            # Already present, possibly with a stale z; bring it up to date
+            self.reposition(obj)
+        z = obj.z
+        i = bisect_right(self._keys, z)
+        self._keys.insert(i, z)
+        self._objects.insert(i, obj)
+        self._count[k] = self._count.get(k, 0) + 1
+        self._z[k] = z
+
+    def _find(self, obj):
+        """Find the index of obj, which must be in the list."""
+        z = self._z[id(obj)]
+        i = bisect_left(self._keys, z)
+        while self._objects[i] is not obj:
+            i += 1
+        return i
+
+    def remove(self, obj):
+        """Remove an object.
+
+        Raise ValueError if the object is not in the list.
+
+        """
+        k = id(obj)
+        if k not in self._count:
+            raise ValueError("%r is not in the display list" % obj)
+        i = self._find(obj)
+        del self._keys[i]
+        del self._objects[i]
+        self._count[k] -= 1
+        if not self._count[k]:
+            del self._count[k]
+            del self._z[k]
+
+    def reposition(self, obj):
+        """Move obj to its place in the list after its z-index has changed.
+
+        This is cheap if the z-index hasn't changed, or has changed only
+        slightly. Objects that are not in the list are ignored.
+
+        """
+        k = id(obj)
+        old = self._z.get(k)
+        z = obj.z
+        if old is None or old == z:
+            return
+
+        keys = self._keys
+        objects = self._objects
+        for _ in range(self._count[k]):
+            i = self._find(obj)
+
+            # Shift neighbours over towards the new position, like one step
+            # of an insertion sort
+            if z < old:
+                while i > 0 and keys[i - 1] > z:
+                    keys[i] = keys[i - 1]
+                    objects[i] = objects[i - 1]
+                    i -= 1
+            else:
+                last = len(keys) - 1
+                while i < last and keys[i + 1] <= z:
+                    keys[i] = keys[i + 1]
+                    objects[i] = objects[i + 1]
+                    i += 1
+            keys[i] = z
+            objects[i] = obj
+        self._z[k] = z
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    class Obj:
+        def __init__(self, z):
+            self.y = z
+
+        @property
+        def z(self):
+            return self.y
+
+    FRAMES = 1000
+    MOVERS = 5
+
+    print("objects   sort every frame   display list")
+    for n in (10, 100, 250, 500, 1000):
+        random.seed(0)
+        objects = [Obj(random.randrange(427)) for _ in range(n)]
+        movers = objects[:MOVERS]
+
+        def move():
+            for o in movers:
+                o.y = min(max(o.y + random.choice((-1, 0, 1)), 0), 426)
+
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            move()
+            objects.sort(key=lambda o: o.z)
+        sort_time = (time.perf_counter() - start) / FRAMES
+
+        dl = DisplayList(objects)
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            move()
+            for o in movers:
+                dl.reposition(o)
+        dl_time = (time.perf_counter() - start) / FRAMES
+
+        assert [o.z for o in dl] == sorted(o.z for o in objects)
+        print("%7d   %13.1fus   %10.1fus" % (
+            n, sort_time * 1e6, dl_time * 1e6
+        ))
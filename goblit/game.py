@@ -1,18 +1,29 @@
 import pygame
 
 from . import scene
+from .render import DirtyRenderer
+from .loaders import Preloader, read_manifest
+from .profiling import profile, phase
 
 screen = None
 
 
 def init():
     global screen
-    pygame.init()
-    pygame.display.set_icon(pygame.image.load(scene.ICON))
-    screen = pygame.display.set_mode((960, 620))
-    pygame.display.set_caption(scene.TITLE)
-
-    scene.load()
+    with phase('display init'):
+        pygame.init()
+        preloader = Preloader(read_manifest())
+        pygame.display.set_icon(pygame.image.load(scene.ICON))
+        screen = pygame.display.set_mode((960, 620))
+        pygame.display.set_caption(scene.TITLE)
+        preloader.mark('display initialised')
+    with phase('assets'):
+        preloader.finish()
+    if profile.enabled:
+        profile.add_section('Preloader', preloader.report())
+
+    with phase('scene'):
+        scene.load()
 
 
 def dispatch(name, event):
@@ -23,11 +34,14 @@ def dispatch(name, event):
 
 def run():
     clock = pygame.time.Clock()
+    renderer = DirtyRenderer(screen)
     while True:
         dt = clock.tick(60)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return
+            elif event.type == pygame.VIDEOEXPOSE:
+                renderer.invalidate()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 dispatch('on_mouse_down', event)
             elif event.type == pygame.MOUSEMOTION:
@@ -36,5 +50,5 @@ def run():
                 dispatch('on_key_down', event)
 
         scene.update(dt / 1000.0)
-        scene.draw(screen)
-        pygame.display.flip()
+        pygame.display.update(renderer.draw(scene.draw))
+        profile.frame_drawn()
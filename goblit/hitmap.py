@@ -3,23 +3,34 @@ import os.path
 import xml.etree.ElementTree as ET
 
 from .navpoints import make_id
+from .loaders import pack
 
 HITMAP_PATH = 'data'
 
 
+def read_regions(path):
+    """Read the rects in the given SVG file, by id."""
+    tree = ET.parse(path)
+    regions = {}
+    for e in tree.iter('{http://www.w3.org/2000/svg}rect'):
+        w = round(float(e.get('width')))
+        h = round(float(e.get('height')))
+        x = round(float(e.get('x')))
+        y = round(float(e.get('y')))
+        id = make_id(e.get('id'))
+        regions[id] = Rect(x, y, w, h)
+    return regions
+
+
 class HitMap:
     @classmethod
     def from_svg(cls, filename):
         path = os.path.join(HITMAP_PATH, filename + '.svg')
-        tree = ET.parse(path)
-        regions = {}
-        for e in tree.iter('{http://www.w3.org/2000/svg}rect'): #findall('.//{http://www.w3.org/2000/svg}rect'):
-            w = round(float(e.get('width')))
-            h = round(float(e.get('height')))
-            x = round(float(e.get('x')))
-            y = round(float(e.get('y')))
-            id = make_id(e.get('id'))
-            regions[id] = Rect(x, y, w, h)
+        entry = pack.lookup('hitmap', filename, path)
+        if entry:
+            regions = {id: Rect(r) for id, r in entry['regions'].items()}
+        else:
+            regions = read_regions(path)
         assert regions, "No regions loaded from %s" % filename
         return cls(regions)
 
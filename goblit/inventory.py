@@ -1,8 +1,9 @@
+import os.path
 from copy import copy
 from collections import defaultdict
-from pygame import Rect
+from pygame import Rect, Surface, RLEACCEL
 
-from .loaders import load_image
+from .loaders import load_image, IMAGE_DIR
 from .actions import Action
 from .errors import ScriptError
 
@@ -170,29 +171,48 @@ class Item:
 
     def __init__(self, name, image_name=None):
         self.name = name.upper()
-        self.image_name = image_name or name.lower().replace(' ', '-')
+        self.image_name = image_name or self.default_image_name(name)
         self.items[self.name] = self
-        self._im = self._icon = None
+
+    @staticmethod
+    def default_image_name(name):
+        return name.lower().replace(' ', '-')
+
+    @classmethod
+    def exists(cls, name):
+        """Return True if name is an item that has been defined.
+
+        Items need not be created explicitly: any item with an icon image
+        exists.
+
+        """
+        if name in cls.items:
+            return True
+        icon = cls.default_image_name(name) + '-icon.png'
+        return os.path.exists(os.path.join(IMAGE_DIR, icon))
 
     @property
     def image(self):
-        if self._im:
-            return self._im
-        self._im = load_image(self.image_name)
-        return self._im
+        return load_image(self.image_name)
 
     @property
     def icon(self):
-        if self._icon:
-            return self._icon
-        self._icon = load_image(self.image_name + '-icon')
-        return self._icon
+        return load_image(self.image_name + '-icon')
 
 
 class Inventory:
 
     item_bg = None
 
+    # Screen position of the top left slot
+    ORIGIN = 21, 460
+
+    # Distance between slots, and the size of each slot
+    SPACING = 78
+    SLOT_SIZE = 60
+
+    COLUMNS = 12
+
     @classmethod
     def load(cls):
         """Load common item sprites."""
@@ -204,12 +224,14 @@ class Inventory:
     def __init__(self, items=[]):
         self.items = items
         self.selected = None
+        self._panel = None
 
     def __getstate__(self):
         return [i.name for i in self.items]
 
     def __setstate__(self, v):
         self.items = []
+        self._panel = None
         for i in v:
             item = Item.items[i]
             try:
@@ -221,6 +243,7 @@ class Inventory:
 
     def clear(self):
         self.selected = None
+        self._panel = None
         del self.items[:]
 
     def add(self, item):
@@ -228,12 +251,14 @@ class Inventory:
         if item in self.items:
             item = copy(item)
         self.items.append(item)
+        self._panel = None
 
     def remove(self, item):
         """Remove item from inventory."""
         if item is self.selected:
             self.selected = None
         self.items.remove(item)
+        self._panel = None
 
     def gain(self, item_name):
         """Add the item wih the given name to the inventory."""
@@ -258,54 +283,102 @@ class Inventory:
         for item in self.items:
             yield x, y, item
             x += 1
-            if x == 12:
+            if x == self.COLUMNS:
                 x = 0
                 y += 1
 
-    def screen_layout(self, grid):
+    def screen_layout(self, grid, origin=ORIGIN):
         """Iterate items in a grid layout as (x, y, item) tuples.
 
-        Unlike layout() above, the coordinates are in screen space.
+        Unlike layout() above, the coordinates are in screen space, or
+        relative to the given origin.
 
         """
+        ox, oy = origin
         for x, y, item in grid:
-            x = 21 + 78 * x
-            y = 460 + 78 * y
+            x = ox + self.SPACING * x
+            y = oy + self.SPACING * y
             yield x, y, item
 
     def full_grid(self):
-        return ((x, y, None) for y in range(2) for x in range(12))
+        return ((x, y, None) for y in range(2) for x in range(self.COLUMNS))
 
     def grid_bounds(self):
         """Iterate over the inventory as (rect, item) pairs."""
+        size = self.SLOT_SIZE
         for x, y, item in self.screen_layout(self.layout()):
-            yield Rect(x, y, 60, 60), item
+            yield Rect(x, y, size, size), item
 
     def item_for_pos(self, pos):
-        for r, item in self.grid_bounds():
-            if r.collidepoint(pos):
-                return item
+        ox, oy = self.ORIGIN
+        x, y = pos
+        col, dx = divmod(x - ox, self.SPACING)
+        row, dy = divmod(y - oy, self.SPACING)
+        if not (0 <= col < self.COLUMNS and row >= 0):
+            return None
+        if dx >= self.SLOT_SIZE or dy >= self.SLOT_SIZE:
+            return None
+        i = row * self.COLUMNS + col
+        if i < len(self.items):
+            return self.items[i]
 
     def select(self, item):
         if self.selected is item:
             self.selected = None
         else:
             self.selected = item
+        self._panel = None
 
     def deselect(self):
         self.selected = None
+        self._panel = None
 
-    def draw(self, screen):
+    def _build_panel(self):
+        """Composite all the inventory slots into a single surface.
+
+        Return the surface and the screen position to draw it at.
+
+        The panel sits over the black area below the room, so rather than
+        use per-pixel alpha we draw onto black and make black transparent.
+        Icons may overhang their slots, so the panel has a margin for them.
+
+        """
         self.load()
-        for x, y, item in self.screen_layout(self.layout()):
+        half = self.SLOT_SIZE // 2
+        icons = [item.icon for item in self.items]
+        margin = max(
+            max(0, (max(im.get_size()) + 1) // 2 - half) for im in icons
+        )
+
+        rows = (len(self.items) - 1) // self.COLUMNS + 1
+        cols = min(len(self.items), self.COLUMNS)
+        w = self.SPACING * (cols - 1) + self.SLOT_SIZE + 2 * margin
+        h = self.SPACING * (rows - 1) + self.SLOT_SIZE + 2 * margin
+        panel = Surface((w, h))
+        panel.fill((0, 0, 0))
+
+        slots = list(
+            self.screen_layout(self.layout(), origin=(margin, margin))
+        )
+        for x, y, item in slots:
             bg = self.item_bg_on if item is self.selected else self.item_bg
-            screen.blit(bg, (x, y))
+            panel.blit(bg, (x, y))
 
-        for x, y, item in self.screen_layout(self.layout()):
-            im = item.icon
+        for (x, y, item), im in zip(slots, icons):
             r = im.get_rect()
-            r.center = (x + 30, y + 30)
-            screen.blit(im, r)
+            r.center = (x + half, y + half)
+            panel.blit(im, r)
+        panel.set_colorkey((0, 0, 0), RLEACCEL)
+
+        ox, oy = self.ORIGIN
+        return panel, (ox - margin, oy - margin)
+
+    def draw(self, screen):
+        if not self.items:
+            return
+        if self._panel is None:
+            self._panel = self._build_panel()
+        screen.blit(*self._panel)
 
 
 inventory = Inventory()
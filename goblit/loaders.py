@@ -1,17 +1,466 @@
+import os
+import json
+import mmap
+import struct
+import threading
+import time
 import pygame
-import os.path
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 
 # This is the directory in which graphics will be stored
 IMAGE_DIR = 'graphics'
 
+# This is the directory in which sounds will be stored
+SOUND_DIR = 'sound'
 
-def load_image(name):
+# The default amount of memory that unpinned assets may occupy
+DEFAULT_BUDGET = 64 * 1024 * 1024
+
+# A list of the images to decode at startup
+PRELOAD_MANIFEST = 'data/preload.txt'
+
+# The pack of pre-decoded assets written by goblit.bake
+PACK_PATH = 'data/assets.pack'
+PACK_MAGIC = b'GOBLPACK'
+PACK_VERSION = 2
+PACK_HEADER = struct.Struct('<8sII')  # magic, version, index length
+PACK_ALIGN = 16
+
+# The byte order of pixels in the pack; this matches the ARGB8888 format
+# that convert_alpha() produces on little-endian machines
+PACK_PIXEL_FORMAT = 'BGRA'
+
+# Colours to try as the colorkey for images with only on/off transparency
+COLORKEYS = [(255, 0, 255), (0, 255, 255), (255, 255, 0), (1, 2, 3)]
+
+
+def surface_bytes(surf):
+    """Get the number of bytes of pixel data held by a Surface.
+
+    Subsurfaces share their parent's pixels, so hold none of their own.
+
+    """
+    if surf.get_parent() is not None:
+        return 0
+    return surf.get_pitch() * surf.get_height()
+
+
+class AssetCache:
+    """A cache of loaded assets, keyed by name.
+
+    Assets are kept in least-recently-used order. When the total size of the
+    cached assets exceeds the budget, the least recently used assets are
+    evicted, unless they have been pinned.
+
+    """
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.assets = OrderedDict()  # key -> [asset, size, pinned]
+        self.resident = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.assets
+
+    def get(self, key, load, size=surface_bytes, pin=False):
+        """Get the asset with the given key.
+
+        If the asset is not cached, call load() to load it, and size(asset)
+        to find out how many bytes it occupies.
+
+        """
+        try:
+            entry = self.assets[key]
+        except KeyError:
+            self.misses += 1
+            asset = load()
+            entry = [asset, size(asset), pin]
+            self.assets[key] = entry
+            self.resident += entry[1]
+            self.evict()
+        else:
+            self.hits += 1
+            self.assets.move_to_end(key)
+            entry[2] = entry[2] or pin
+        return entry[0]
+
+    def pin(self, key):
+        """Prevent the given asset from being evicted."""
+        self.assets[key][2] = True
+
+    def unpin(self, key):
+        """Allow the given asset to be evicted again."""
+        self.assets[key][2] = False
+        self.evict()
+
+    def evict(self):
+        """Evict unpinned assets until we are within the budget."""
+        if self.resident <= self.budget:
+            return
+        for key, (asset, size, pinned) in list(self.assets.items()):
+            if self.resident <= self.budget:
+                break
+            if pinned:
+                continue
+            del self.assets[key]
+            self.resident -= size
+            self.evictions += 1
+
+    def report(self):
+        """Get a one-line summary of the cache's performance."""
+        return (
+            "%d assets resident (%.1fMB of %.1fMB budget), "
+            "%d hits, %d misses, %d evictions" % (
+                len(self.assets),
+                self.resident / 1048576,
+                self.budget / 1048576,
+                self.hits, self.misses, self.evictions
+            )
+        )
+
+
+assets = AssetCache()
+
+
+def pack_align(offset):
+    """Round offset up to the alignment of blobs in the pack."""
+    return -(-offset // PACK_ALIGN) * PACK_ALIGN
+
+
+def source_stamp(path):
+    """Get the size and modification time of a file, or None if missing.
+
+    The pack records this for each file an entry was baked from, so that we
+    can tell when the entry is stale.
+
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class AssetPack:
+    """A pack of pre-decoded assets, memory-mapped from disk.
+
+    The pack consists of a header, a JSON index and a series of aligned
+    blobs. The index maps each kind of asset to a dict of entries by name;
+    entries record the stamp of their source file and, if they have pixel
+    data, the offset and length of their blob, relative to the end of the
+    index. Small images are packed into atlas pages, and their entries give
+    the page and the rect they occupy on it instead.
+
+    Images are created directly over the mapped pixel data, so loading them
+    involves no decoding and no copying. The mapping is copy-on-write, so
+    it is safe to draw on them.
+
+    """
+    def __init__(self, path=PACK_PATH):
+        self.path = path
+        self.index = None
+        self.map = None
+        self.base = 0
+        self.pages = {}
+        self.lock = threading.Lock()
+
+    def _open(self):
+        """Map the pack and read its index, if we haven't already."""
+        with self.lock:
+            if self.index is not None:
+                return
+            self.index = {}
+            try:
+                f = open(self.path, 'rb')
+            except OSError:
+                return
+            with f:
+                header = f.read(PACK_HEADER.size)
+                if len(header) < PACK_HEADER.size:
+                    return
+                magic, version, index_len = PACK_HEADER.unpack(header)
+                if magic != PACK_MAGIC or version != PACK_VERSION:
+                    print("Ignoring %s: not a version %d asset pack" % (
+                        self.path, PACK_VERSION
+                    ))
+                    return
+                self.index = json.loads(f.read(index_len).decode('utf8'))
+                self.base = pack_align(PACK_HEADER.size + index_len)
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    def lookup(self, kind, name, source):
+        """Get the index entry for an asset.
+
+        Return None if the pack does not contain the asset, or if the entry
+        is stale, ie. the source file has changed since the pack was baked.
+
+        """
+        self._open()
+        entry = self.index.get(kind, {}).get(name)
+        if entry is None or entry['source'] != source_stamp(source):
+            return None
+        return entry
+
+    def data(self, entry):
+        """Get a buffer of the blob for the given entry."""
+        start = self.base + entry['offset']
+        return memoryview(self.map)[start:start + entry['length']]
+
+    def surface(self, entry):
+        """Create a Surface over the pixel data of the given entry."""
+        return pygame.image.frombuffer(
+            self.data(entry), entry['size'], PACK_PIXEL_FORMAT
+        )
+
+    def page(self, num):
+        """Get the Surface for an atlas page."""
+        with self.lock:
+            try:
+                return self.pages[num]
+            except KeyError:
+                page = self.pages[num] = self.surface(
+                    self.index['atlas'][str(num)]
+                )
+                return page
+
+    def image(self, name, source):
+        """Get a Surface for the named image, or None if not packed."""
+        entry = self.lookup('image', name, source)
+        if entry is None:
+            return None
+        if 'page' in entry:
+            return self.page(entry['page']).subsurface(entry['rect'])
+        return self.surface(entry)
+
+
+pack = AssetPack()
+
+
+@lru_cache()
+def display_alpha_masks():
+    """Get the pixel masks of the display's per-pixel alpha format."""
+    probe = pygame.Surface((1, 1), pygame.SRCALPHA)
+    return probe.convert_alpha().get_masks()
+
+
+def decode_image(name):
+    """Load an image from the asset pack, or from disk if it isn't packed.
+
+    This does not need the display, and can be called from any thread.
+
+    """
     path = os.path.join(IMAGE_DIR, name + '.png')
-    surf = pygame.image.load(path)
+    return pack.image(name, path) or pygame.image.load(path)
+
+
+def classify_alpha(surf):
+    """Classify an image by how it uses its alpha channel.
+
+    Return 'opaque' if every pixel is fully opaque, 'binary' if every pixel
+    is either fully transparent or fully opaque, or 'blend' if it needs
+    per-pixel alpha blending.
+
+    """
+    alpha = pygame.image.tostring(surf, 'RGBA')[3::4]
+    if not alpha.translate(None, b'\xff'):
+        return 'opaque'
+    if not alpha.translate(None, b'\x00\xff'):
+        return 'binary'
+    return 'blend'
+
+
+def colorkey_image(surf):
+    """Convert an image with on/off transparency to use a colorkey.
+
+    Return None if every candidate colorkey is used by an opaque pixel.
+
+    """
+    opaque = pygame.mask.from_surface(surf, 254)
+    for key in COLORKEYS:
+        used = pygame.mask.from_threshold(surf, key, (1, 1, 1, 255))
+        if not opaque.overlap_area(used, (0, 0)):
+            break
+    else:
+        return None
+    keyed = pygame.Surface(surf.get_size()).convert()
+    keyed.fill(key)
+    keyed.blit(surf, (0, 0))
+    keyed.set_colorkey(key, pygame.RLEACCEL)
+    return keyed
+
+
+def prepare_image(surf):
+    """Convert a decoded image for fast blitting to the display.
+
+    Opaque images are converted without alpha, and images with on/off
+    transparency are converted to use an RLE-accelerated colorkey; only
+    images that really need it keep per-pixel alpha. Images from the pack
+    are usually in the display's alpha format already, and if they need
+    alpha they are used as they are.
+
+    Atlas sprites are subsurfaces of a page; the whole page is prepared,
+    once, and the sprite is taken from that.
+
+    """
+    parent = surf.get_parent()
+    if parent is not None:
+        page = assets.get(
+            ('page', id(parent)),
+            lambda: prepare_image(parent),
+            pin=True
+        )
+        rect = pygame.Rect(surf.get_offset(), surf.get_size())
+        return page.subsurface(rect)
+
+    kind = classify_alpha(surf)
+    if kind == 'opaque':
+        return surf.convert()
+    if kind == 'binary':
+        keyed = colorkey_image(surf)
+        if keyed:
+            return keyed
+    if surf.get_flags() & pygame.SRCALPHA and \
+            surf.get_masks() == display_alpha_masks():
+        return surf
     return surf.convert_alpha()
 
 
+def load_image(name):
+    def load():
+        return prepare_image(decode_image(name))
+    return assets.get(('image', name), load)
+
+
+def read_manifest(path=PRELOAD_MANIFEST):
+    """Read a list of image names, one per line."""
+    with open(path, encoding='utf8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                yield line
+
+
+class Preloader:
+    """Decode a list of images in the background, on a thread pool.
+
+    The PNG decoder releases the GIL, so this can be started before the
+    display is initialised. Converting the images for the display must wait
+    for the display and happens on the main thread, in finish().
+
+    """
+    def __init__(self, names, workers=None):
+        self.start = time.perf_counter()
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ThreadPoolExecutor(self.workers)
+        self.names = [n for n in names if ('image', n) not in assets]
+        self.futures = [
+            self.pool.submit(self._decode, name)
+            for name in self.names
+        ]
+        self.timeline = [('submitted %d images' % len(self.names), 0.0)]
+        self.work = 0  # Total time spent decoding, across all threads
+
+    def _decode(self, name):
+        """Decode an image, returning it with the time taken."""
+        start = time.perf_counter()
+        surf = decode_image(name)
+        return surf, time.perf_counter() - start
+
+    def mark(self, event):
+        """Record an event on the startup timeline."""
+        self.timeline.append((event, time.perf_counter() - self.start))
+
+    def finish(self):
+        """Wait for all images to be decoded and convert them.
+
+        Images that failed to decode are skipped; they will be loaded (and
+        fail again, loudly) when they are first used.
+
+        """
+        decoded = []
+        for name, future in zip(self.names, self.futures):
+            try:
+                surf, t = future.result()
+            except Exception as e:
+                print("Couldn't preload %s: %s" % (name, e))
+                continue
+            self.work += t
+            decoded.append((name, surf))
+        self.pool.shutdown()
+        self.mark('decoded %d images' % len(decoded))
+
+        for name, surf in decoded:
+            assets.get(('image', name), lambda: prepare_image(surf))
+        self.mark('converted %d images' % len(decoded))
+
+    def report(self):
+        """Get the startup timeline as a string."""
+        lines = [
+            '%7.1fms  %s' % (t * 1000, event)
+            for event, t in self.timeline
+        ]
+        lines.append('%.1fms of decoding on %d threads' % (
+            self.work * 1000, self.workers
+        ))
+        return '\n'.join(lines)
+
+
 def load_frames(base, num):
     for i in range(1, num + 1):
         yield load_image('%s-%d' % (base, i))
+
+
+def load_font(path, size):
+    """Load a font. Fonts are small, so they are never evicted."""
+    def load():
+        return pygame.font.Font(path, size)
+    return assets.get(('font', path, size), load, size=lambda f: 0, pin=True)
+
+
+if __name__ == '__main__':
+    # Compare blitting every image converted with convert_alpha(), as we used
+    # to, against blitting it as prepared by prepare_image()
+    from collections import defaultdict
+
+    REPEAT = 200
+
+    pygame.init()
+    screen = pygame.display.set_mode((960, 600))
+
+    def blit_time(surf):
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            screen.blit(surf, (0, 0))
+        return (time.perf_counter() - start) / REPEAT
+
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    frame = [0.0, 0.0]
+    for filename in sorted(os.listdir(IMAGE_DIR)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.png':
+            continue
+        surf = decode_image(name)
+        kind = classify_alpha(surf)
+        before = blit_time(surf.convert_alpha())
+        after = blit_time(prepare_image(surf))
+        total = totals[kind]
+        total[0] += 1
+        total[1] += before
+        total[2] += after
+        if name in ('room-tox', 'foreground', 'tox-sitting-desk'):
+            frame[0] += before
+            frame[1] += after
+
+    print("kind     images   convert_alpha   prepare_image")
+    for kind, (count, before, after) in sorted(totals.items()):
+        print("%-8s %6d   %11.1fus   %11.1fus" % (
+            kind, count, before / count * 1e6, after / count * 1e6
+        ))
+    print("Act 1 frame (room, foreground, Tox): %.1fus -> %.1fus" % (
+        frame[0] * 1e6, frame[1] * 1e6
+    ))
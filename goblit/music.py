@@ -1,27 +1,133 @@
-import os.path
-from pygame.mixer import Sound
+"""Background music.
+
+The next track that the script will play is prefetched: it is decoded into
+a Sound on a worker thread, so that when it is played it can be crossfaded
+with the previous track on a mixer channel. A decoded track takes about 30MB,
+so only the next track is held decoded, besides the one playing. Tracks that
+haven't been prefetched (or haven't finished decoding) are streamed from disk
+by pygame.mixer.music instead; this starts quickly, but can only fade in.
 
-SOUND_PATH = 'sound'
+"""
+import os.path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pygame.mixer
 
+from .loaders import SOUND_DIR
 
-def load_sound(filename):
-    path = os.path.join(SOUND_PATH, filename + '.ogg')
-    return Sound(path)
+MUSIC_VOLUME = 0.4
 
+# The duration of crossfades between tracks, in milliseconds
+CROSSFADE_MS = 1500
 
 music_name = None
-music_playing = None
 
 
-def play_music(name):
-    global music_playing, music_name
-    if music_name == name:
-        return
+class MusicManager:
+    """Play music, crossfading between tracks."""
+
+    def __init__(self):
+        self.name = None
+        self.channel = None  # The channel playing the track, if decoded
+        self.decoded = OrderedDict()  # name -> Future of a Sound
+        self.pool = ThreadPoolExecutor(1)
+
+    @staticmethod
+    def path(name):
+        return os.path.join(SOUND_DIR, name + '.ogg')
+
+    def prefetch(self, name):
+        """Start decoding the named track in the background.
+
+        This replaces any track prefetched before, unless it is playing.
+
+        """
+        if name in self.decoded:
+            self.decoded.move_to_end(name)
+            return
+        self.decoded[name] = self.pool.submit(
+            pygame.mixer.Sound, self.path(name)
+        )
+        self.trim()
+
+    def trim(self):
+        """Drop all decoded tracks but the one playing and the next one.
+
+        The next track is the one most recently prefetched. A track that is
+        still fading out keeps playing, as its channel holds on to it.
+
+        """
+        keep = {self.name}
+        if self.decoded:
+            keep.add(next(reversed(self.decoded)))
+        for name in list(self.decoded):
+            if name not in keep:
+                self.decoded.pop(name).cancel()
+
+    def decoded_sound(self, name):
+        """Get the named track if it has been decoded, else None."""
+        future = self.decoded.get(name)
+        if future is None or not future.done() or future.cancelled():
+            return None
+        if future.exception():
+            del self.decoded[name]
+            return None
+        return future.result()
 
-    if music_playing:
-        music_playing.stop()
+    def fadeout(self):
+        """Fade out the track that is playing."""
+        if self.channel:
+            self.channel.fadeout(CROSSFADE_MS)
+            self.channel = None
+        elif self.name:
+            pygame.mixer.music.fadeout(CROSSFADE_MS)
 
+    def play(self, name):
+        """Switch to the named track, looping it."""
+        if self.name == name:
+            return
+
+        sound = self.decoded_sound(name)
+        channel = None
+        if sound:
+            sound.set_volume(MUSIC_VOLUME)
+            channel = sound.play(-1, fade_ms=CROSSFADE_MS)
+            if channel:
+                self.fadeout()
+        if not channel:
+            # Streaming; loading stops any streamed track at once, so this
+            # fades in but can't crossfade from a streamed track
+            self.fadeout()
+            pygame.mixer.music.load(self.path(name))
+            pygame.mixer.music.set_volume(MUSIC_VOLUME)
+            pygame.mixer.music.play(-1, fade_ms=CROSSFADE_MS)
+        self.channel = channel
+        self.name = name
+        self.trim()
+
+    def shutdown(self):
+        """Stop decoding tracks, when the game exits.
+
+        Decoding that hasn't started is cancelled, and a track that is being
+        decoded isn't waited for here.
+
+        """
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+manager = MusicManager()
+
+
+def play_music(name):
+    global music_name
+    manager.play(name)
     music_name = name
-    music_playing = load_sound(name)
-    music_playing.set_volume(0.4)
-    music_playing.play(-1)
+
+
+def prefetch_music(name):
+    """Prepare to play the named track soon."""
+    manager.prefetch(name)
+
+
+def shutdown():
+    manager.shutdown()
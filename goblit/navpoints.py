@@ -2,6 +2,8 @@ import re
 import os.path
 import xml.etree.ElementTree as ET
 
+from .loaders import pack
+
 NAVPOINT_PATH = 'data'
 
 
@@ -9,9 +11,8 @@ def make_id(id):
     return re.sub(r'[-_]+', ' ', id.upper())
 
 
-def points_from_svg(filename):
-    """Load navigation points from the given SVG file."""
-    path = os.path.join(NAVPOINT_PATH, filename + '.svg')
+def read_points(path):
+    """Read the positions of the markers in the given SVG file, by id."""
     tree = ET.parse(path)
     points = {}
     for e in tree.iter('{http://www.w3.org/2000/svg}use'):
@@ -20,6 +21,16 @@ def points_from_svg(filename):
         pos = tuple(round(float(g)) for g in mo.groups())
         id = make_id(e.get('id'))
         points[id] = pos
-    assert points, "No nav points loaded from %s" % filename
     return points
 
+
+def points_from_svg(filename):
+    """Load navigation points from the given SVG file."""
+    path = os.path.join(NAVPOINT_PATH, filename + '.svg')
+    entry = pack.lookup('navpoints', filename, path)
+    if entry:
+        points = {id: tuple(pos) for id, pos in entry['points'].items()}
+    else:
+        points = read_points(path)
+    assert points, "No nav points loaded from %s" % filename
+    return points
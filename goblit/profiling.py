@@ -0,0 +1,137 @@
+"""Timing of the phases of startup.
+
+Run the game with ``--profile-startup`` to have a breakdown of the time to
+the first frame written to startup-profile.txt. Phases are marked in the code
+with::
+
+    with phase('grid'):
+        ...
+
+which costs next to nothing when profiling is not enabled. Code that runs on
+a worker thread is timed with ``worker_phase()`` instead.
+
+"""
+import time
+import threading
+from contextlib import contextmanager
+
+
+REPORT_PATH = 'startup-profile.txt'
+
+
+class StartupProfile:
+    """A record of how long each phase of startup took."""
+
+    def __init__(self):
+        self.enabled = False
+        self.done = False
+        self.start = time.perf_counter()
+        self.phases = []  # [depth, name, duration]
+        self.depth = 0
+        self.worker_phases = {}  # {name: total duration}
+        self.worker_lock = threading.Lock()
+        self.sections = []
+
+    def enable(self):
+        self.enabled = True
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Time the code in the body of the with statement.
+
+        Phases may be nested; nested phases are indented in the report.
+
+        """
+        if not self.enabled or self.done:
+            yield
+            return
+        record = [self.depth, name, None]
+        self.phases.append(record)
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record[2] = time.perf_counter() - start
+            self.depth -= 1
+
+    @contextmanager
+    def worker_phase(self, name):
+        """Time the code in the body of the with statement, on a worker thread.
+
+        The times of all the phases with the same name are added up. They
+        overlap the phases on the main thread, so they are listed apart from
+        them in the report.
+
+        """
+        if not self.enabled or self.done:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            t = time.perf_counter() - start
+            with self.worker_lock:
+                self.worker_phases[name] = self.worker_phases.get(name, 0) + t
+
+    def add_section(self, title, text):
+        """Add a section of further details to the report."""
+        if self.enabled and not self.done:
+            self.sections.append((title, text))
+
+    def frame_drawn(self):
+        """Note that a frame has been drawn.
+
+        After the first frame, write the report, if we're profiling.
+
+        """
+        if not self.enabled or self.done:
+            return
+        self.total = time.perf_counter() - self.start
+        self.collect_stats()
+        self.done = True
+        with open(REPORT_PATH, 'w', encoding='utf8') as f:
+            f.write(self.report())
+        print("Wrote startup profile to", REPORT_PATH)
+
+    def collect_stats(self):
+        """Add sections describing the state of the caches."""
+        from .loaders import assets
+        from .animations import mirror_cache_bytes
+        from .actors import render_text
+        self.add_section('Asset cache', assets.report())
+        self.add_section('Mirrored sprites', '%.1fKB' % (
+            mirror_cache_bytes() / 1024
+        ))
+        self.add_section('Rendered text', str(render_text.cache_info()))
+
+    def report(self):
+        """Get the profile as a string."""
+        lines = ['%-32s %9s %6s' % ('phase', 'ms', '%')]
+        for depth, name, t in self.phases:
+            if t is None:
+                continue
+            lines.append('%-32s %9.1f %6.1f' % (
+                '  ' * depth + name, t * 1000, 100 * t / self.total
+            ))
+        lines.append('%-32s %9.1f' % (
+            'time to first frame', self.total * 1000
+        ))
+        with self.worker_lock:
+            worker_phases = list(self.worker_phases.items())
+        if worker_phases:
+            lines.extend(['', 'on the worker thread, overlapping the above:'])
+            for name, t in worker_phases:
+                lines.append('%-32s %9.1f %6.1f' % (
+                    '  ' + name, t * 1000, 100 * t / self.total
+                ))
+        for title, text in self.sections:
+            lines.extend(['', title, '-' * len(title), text])
+        return '\n'.join(lines) + '\n'
+
+
+profile = StartupProfile()
+phase = profile.phase
+worker_phase = profile.worker_phase
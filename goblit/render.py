@@ -0,0 +1,145 @@
+"""Dirty rectangle rendering.
+
+Rather than redrawing the whole screen every frame, we let the scene draw
+itself into a DrawList, which records the blits and fills without touching
+any pixels. Comparing the recording with the previous frame's tells us which
+regions of the screen have changed; only those regions are redrawn, by
+replaying the recorded operations with the screen clipped to each region.
+
+"""
+from pygame import Rect
+
+
+class DrawList:
+    """A stand-in for the screen Surface that records drawing operations.
+
+    Each operation is stored as a (key, rect, op, args) tuple. The key
+    identifies what was drawn and where, so that operations can be compared
+    between frames; rect is the screen area the operation affects.
+
+    """
+    def __init__(self, size):
+        self.size = size
+        self.ops = []
+
+    def get_size(self):
+        return self.size
+
+    def get_width(self):
+        return self.size[0]
+
+    def get_height(self):
+        return self.size[1]
+
+    def get_rect(self):
+        return Rect((0, 0), self.size)
+
+    def blit(self, surf, dest, area=None, special_flags=0):
+        if isinstance(dest, Rect):
+            dest = dest.topleft
+        x, y = dest
+        if area is not None:
+            area = Rect(area)
+            r = Rect(x, y, area.w, area.h)
+            area = tuple(area)
+        else:
+            r = surf.get_rect(topleft=(x, y))
+        key = id(surf), x, y, area, special_flags
+        self.ops.append((key, r, 'blit', (surf, (x, y), area, special_flags)))
+        return r
+
+    def fill(self, color, rect=None, special_flags=0):
+        r = Rect(rect) if rect is not None else self.get_rect()
+        color = tuple(color)
+        key = 'fill', color, tuple(r), special_flags
+        self.ops.append((key, r, 'fill', (color, r, special_flags)))
+        return r
+
+    def replay(self, screen, clip):
+        """Replay the recorded operations onto screen, within clip."""
+        screen.set_clip(clip)
+        for key, r, op, args in self.ops:
+            if r.colliderect(clip):
+                getattr(screen, op)(*args)
+        screen.set_clip(None)
+
+    def diff(self, previous):
+        """Get a list of rects that differ between this and previous."""
+        prev_keys = {op[0] for op in previous.ops}
+        keys = {op[0] for op in self.ops}
+
+        dirty = [r for k, r, *_ in self.ops if k not in prev_keys]
+        dirty.extend(r for k, r, *_ in previous.ops if k not in keys)
+
+        # Operations that appear in both frames may still have changed
+        # their stacking order, eg. when two actors pass each other.
+        prev_common = [(k, r) for k, r, *_ in previous.ops if k in keys]
+        common = [(k, r) for k, r, *_ in self.ops if k in prev_keys]
+        for (pk, pr), (k, r) in zip(prev_common, common):
+            if pk != k:
+                dirty.append(pr)
+                dirty.append(r)
+        return dirty
+
+
+def merge_rects(rects):
+    """Merge overlapping rects, returning a (possibly shorter) list."""
+    merged = []
+    for r in rects:
+        r = Rect(r)
+        while True:
+            i = r.collidelist(merged)
+            if i == -1:
+                break
+            r.union_ip(merged.pop(i))
+        merged.append(r)
+    return merged
+
+
+class DirtyRenderer:
+    """Redraw only the parts of the screen that have changed each frame."""
+
+    # If more than this fraction of the screen is dirty, just redraw it all
+    FULL_REDRAW_FRACTION = 0.5
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.last = None
+
+    def invalidate(self):
+        """Force the next frame to be redrawn in full.
+
+        This is necessary if anything other than the renderer has drawn to
+        the screen, eg. when the window has been exposed.
+
+        """
+        self.last = None
+
+    def draw(self, draw_func):
+        """Draw a frame by calling draw_func(screen).
+
+        Return a list of the rects that have been updated, suitable for
+        passing to pygame.display.update().
+
+        """
+        screen_rect = self.screen.get_rect()
+        drawlist = DrawList(screen_rect.size)
+        draw_func(drawlist)
+
+        if self.last is None:
+            dirty = [screen_rect]
+        else:
+            dirty = merge_rects(
+                r.clip(screen_rect)
+                for r in drawlist.diff(self.last)
+                if r.colliderect(screen_rect)
+            )
+            area = sum(r.w * r.h for r in dirty)
+            full_area = screen_rect.w * screen_rect.h
+            if area > self.FULL_REDRAW_FRACTION * full_area:
+                dirty = [screen_rect]
+
+        for r in dirty:
+            drawlist.replay(self.screen, r)
+        self.last = drawlist
+        return dirty
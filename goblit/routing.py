@@ -4,11 +4,16 @@ from math import sqrt
 from itertools import product
 from operator import itemgetter
 
+from .loaders import pack
+
 
 PLAN_DIR = 'data/'
 
 YSCALE = 0.3
 
+# The size of the cells of the routing grid, in floor plan pixels
+SUBDIVIDE = (15, 5)
+
 BLACK = (0, 0, 0)
 
 
@@ -53,9 +58,20 @@ class Grid:
         self.subdivide = subdivide
 
     @classmethod
-    def load(cls, name, subdivide=(15, 5)):
+    def load(cls, name, subdivide=SUBDIVIDE):
         path = os.path.join(PLAN_DIR, name + '.png')
-        surf = pygame.image.load(path)
+        entry = pack.lookup('grid', name, path)
+        if entry and entry['subdivide'] == list(subdivide):
+            surf = pygame.image.frombuffer(
+                pack.data(entry), entry['size'], 'RGB'
+            )
+        else:
+            surf = cls.subsample(pygame.image.load(path), subdivide)
+        return cls(surf, subdivide)
+
+    @classmethod
+    def subsample(cls, surf, subdivide):
+        """Reduce a floor plan to one pixel per grid cell."""
         w, h = surf.get_size()
         subx, suby = subdivide
         subw, subh = w // subx, h // suby
@@ -72,7 +88,7 @@ class Grid:
                 surf.get_at(pos) == cls.GRID_COLOR for pos in orig_pixels)
             if ingrid > threshold:
                 subsampled.set_at((x, y), cls.GRID_COLOR)
-        return cls(subsampled, subdivide)
+        return subsampled
 
     def cost(self, p1, p2):
         x1, y1 = p1
@@ -2,7 +2,7 @@ import sys
 import re
 import random
 from itertools import chain
-from functools import wraps, partial
+from functools import wraps
 from fnmatch import fnmatchcase as fnmatch
 import pygame.mouse
 from pygame.cursors import load_xbm
@@ -11,14 +11,16 @@ from .loaders import load_image
 from .hitmap import HitMap
 from .navpoints import points_from_svg
 from .routing import Grid
+from .displaylist import DisplayList
 from . import clock
 from . import scripts
 from .inventory import FloorItem, PointItem, Item, FixedItem
 from .geom import dist
 from .inventory import inventory
-from .actions import Action, MoveTo, Say, Pause, PCMoveTo, Generic, SceneAction, ParallelAction
+from .actions import Action, MoveTo, Say, Pause, PCMoveTo, Generic, SceneAction
 from .errors import ScriptError
 from . import binding
+from .profiling import phase, worker_phase
 
 # This import actually does the binding - find a better place for it.
 import goblit.stagedirections
@@ -35,7 +37,7 @@ class Scene:
         self.clock = clock
         self.room_bg = None
         self.room_fg = None
-        self.objects = []
+        self.objects = DisplayList()
         self.actors = {}
         self.navpoints = {}
         self.object_scripts = {}
@@ -112,7 +114,7 @@ class Scene:
         }
 
     def _set_state(self, state):
-        self.objects = []
+        self.objects = DisplayList()
         for funcname, params in state['objects']:
             extra = params.pop('__extra__', {})
             obj = getattr(self, funcname)(**params)
@@ -120,22 +122,17 @@ class Scene:
                 for k, v in extra.items():
                     setattr(obj, k, v)
 
-        all_directives = player.binding_directives_seen()
-        directives_by_uid = {d.uid: d for d in all_directives}
-        directives_by_action = {d.data: d for d in all_directives}
         errors = 0
         for is_bound, uid in state['object_scripts']:
             if not is_bound:
                 self.object_scripts[uid] = None
                 continue
-            try:
-                d = directives_by_uid[uid]
-            except KeyError:
+            d = player.find_binding_directive(uid)
+            if not d:
                 errors += 1
                 print("Warning: no directive found like", uid)
-                try:
-                    d = directives_by_action[uid[1]]
-                except KeyError:
+                d = player.last_binding_directive(uid[1])
+                if not d:
                     continue
             self.object_scripts[d.data] = d
         if errors:
@@ -145,13 +142,22 @@ class Scene:
         self.room_bg = load_image(name)
 
     def load(self):
-        self.set_bg('room-tox')
-        self.room_fg = load_image('foreground')
-        self.hitmap = HitMap.from_svg('hit-areas')
-        self.navpoints = points_from_svg('navigation-points')
-        self.grid = Grid.load('floor')
-        from .actors import ACTORS
-        self.actors = {cls.NAME: cls(self) for cls in ACTORS}
+        with phase('backgrounds'):
+            self.set_bg('room-tox')
+            self.room_fg = load_image('foreground')
+        with phase('hitmap and navpoints'):
+            self.hitmap = HitMap.from_svg('hit-areas')
+            self.navpoints = points_from_svg('navigation-points')
+        with phase('grid'):
+            self.grid = Grid.load('floor')
+        with phase('actors'):
+            from .actors import ACTORS
+            self.actors = {cls.NAME: cls(self) for cls in ACTORS}
+
+    def preload(self):
+        """Load the sprites for the actors that are on set."""
+        from .actors import preload
+        preload(a.NAME for a in self.actors.values() if a.visible)
 
     def init_scene(self):
         self.spawn_actor('WIZARD TOX', (719, 339), initial='sitting-at-desk')
@@ -210,7 +216,7 @@ class Scene:
 
     def unspawn_actor(self, actor):
         if isinstance(actor, str):
-            actor = self.actors[name]
+            actor = self.actors[actor]
         try:
             self.objects.remove(actor)
         except ValueError:
@@ -338,7 +344,6 @@ class Scene:
         sw, sh = screen.get_size()
         screen.fill((0, 0, 0), pygame.Rect(0, rh, sw, sh - rh))
 
-        self.objects.sort(key=lambda o: o.z)
         for o in self.objects:
             o.draw(screen)
         screen.blit(self.room_fg, (0, 0))
@@ -565,40 +570,106 @@ class TitleBanner(Banner):
         screen.blit(self.surf, (sw // 2 - w // 2, 170))
 
 
+def resolve_bindings(instructions):
+    """Resolve the stage directions among instructions to their bindings.
+
+    This is called on the worker thread as each act of the script is parsed.
+
+    """
+    with worker_phase('binding'):
+        for direction in scripts.walk(instructions):
+            if not isinstance(direction, scripts.StageDirection):
+                continue
+            direction.bindings = []
+            for d in direction.directions:
+                try:
+                    resolved = binding.resolve_stagedirection(d)
+                except ScriptError as e:
+                    print(e)
+                    resolved = None
+                direction.bindings.append(resolved)
+    binding.print_suggestions()
+
+
+# The number of acts of the script to hold in memory: the one playing, and
+# those after it that are loaded ahead of time
+ACT_WINDOW = 2
+
+
 class ScriptPlayer:
     @classmethod
     def from_file(cls, name, clock=clock):
-        s = scripts.parse_file(name)
-        return cls(s, clock)
+        with phase('script parse'):
+            acts = scripts.ActReader(
+                name, binding.fingerprint(), resolve_bindings
+            )
+            return cls(acts, clock)
 
-    def __init__(self, script, clock):
+    def __init__(self, acts, clock):
         self.clock = clock
         self.stack = []
         self.finished = False
         self.fast_forward = False
         self.need_save = False
         self.banner = None
-        self.stack.append([script, 0, None, None])
-        self.prepare_script()
+        self.program = scripts.Program(acts)
+        self.handlers = {  # instruction type -> handler method
+            cls: getattr(self, 'do_' + cls.__name__.lower())
+            for cls in scripts.INSTRUCTION_TYPES
+        }
+        self.act = -1  # The act that is playing
 
-    def prepare_script(self):
-        """Prepare the script, by binding all stage directions."""
-        for direction in self.walk_stagedirections():
-            actions = []
-            for d in direction.directions:
-                try:
-                    a = binding.lookup_stagedirection(d)
-                except ScriptError as e:
-                    print(e)
-                else:
-                    actions.append(a)
+        # Each frame is [pc, end, waiting, dialogue_choice]
+        self.stack.append([0, 0, None, None])
+        self.next_act()
+
+    def next_act(self):
+        """Move the root frame on to the start of the next act.
+
+        Acts are loaded ahead, up to ACT_WINDOW, and acts before the one
+        that is playing are released. Return False if the script is over.
+
+        """
+        act = self.act + 1
+        program = self.program
+        while len(program.act_spans) < act + ACT_WINDOW:
+            span = program.load_act()
+            if span is None:
+                break
+            self.prepare_script(*span)
+        if act >= len(program.act_spans):
+            return False
+        self.act = act
+        self.stack[0][:2] = program.act_spans[act]
+        if act:
+            program.release_act(act - 1)
+        return True
+
+    def prepare_script(self, start, end):
+        """Prepare some code for playing.
+
+        This binds the stage directions in it, whose bindings must have been
+        resolved already, and parses the arguments of directives.
+
+        """
+        from . import directives
+        directives.scene = scene
+        for direction in self.program.code[start:end]:
+            if isinstance(direction, scripts.Directive):
+                directives.prepare(direction)
+                continue
+            if not isinstance(direction, scripts.StageDirection):
+                continue
+            actions = [
+                binding.bind_stagedirection(*b)
+                for b in direction.bindings if b is not None
+            ]
             if not actions:
-                direction.action = lambda scene: Pause(0.5)
+                direction.action = binding.Binding(lambda scene: Pause(0.5))
             elif len(actions) == 1:
                 direction.action = actions[0]
             else:
-                direction.action = ParallelAction(*actions)
-        binding.print_suggestions()
+                direction.action = binding.ParallelBinding(actions)
 
     def start(self):
         self.next()
@@ -639,21 +710,9 @@ class ScriptPlayer:
             save_game()
         self.need_save = False
 
-    @property
-    def root_script(self):
-        return self.stack[0][0]
-
-    @property
-    def script(self):
-        return self.stack[-1][0]
-
     @property
     def step(self):
-        return self.stack[-1][1]
-
-    @step.setter
-    def step(self, v):
-        self.stack[-1][1] = v
+        return self.stack[-1][0]
 
     @property
     def _waiting(self):
@@ -700,9 +759,17 @@ class ScriptPlayer:
         return not self.dialogue_choice
 
     def play_subscript(self, script):
+        """Play the contents of a script or directive."""
+        self._play_code(*self.program.block(script))
+
+    def play_instruction(self, instruction):
+        """Play a single instruction from the script."""
+        self._play_code(*self.program.span(instruction))
+
+    def _play_code(self, start, end):
         if self.need_save:
             self.save(solved=True)
-        self.stack.append([script, 0, None, None])
+        self.stack.append([start, end, None, None])
         if scene.animation:
             scene.on_animation_finish(self.next)
         else:
@@ -719,20 +786,31 @@ class ScriptPlayer:
     def next(self):
         if self.need_save:
             self.save(solved=True)
-        if self.step >= len(self.script.contents):
+        frame = self.stack[-1]
+        pc = frame[0]
+        if pc >= frame[1]:
             if len(self.stack) > 1:
                 self.end_subscript()
+                return
+            try:
+                more = self.next_act()
+            except Exception as e:
+                print("Couldn't load the next act of the script:", e)
+                more = False
+            if more:
+                self.next()
             else:
                 self.finished = True
                 self.on_finish()
             return
-        instruction = self.script.contents[self.step]
-        self.step += 1
-        op = type(instruction).__name__.lower()
-        handler = getattr(self, 'do_' + op, None)
+        instruction = self.program.code[pc]
+        frame[0] = self.program.ends[pc]
+        handler = self.handlers.get(type(instruction))
         try:
             if not handler:
-                raise ScriptError("No handler for op %s" % op)
+                raise ScriptError(
+                    "No handler for op %s" % type(instruction).__name__.lower()
+                )
             handler(instruction)
         except ScriptError as e:
             print(e.args[0])
@@ -784,35 +862,31 @@ class ScriptPlayer:
         self.clock.unschedule(self.next)  # In case we're already scheduled
         self.clock.schedule(self.next, delay)
 
-    def walk_script(self, script=None):
-        """Iterate over the script."""
-        if script is None:
-            script = self.root_script.contents
-        for s in script:
-            yield s
-            if isinstance(s, scripts.Directive):
-                yield from self.walk_script(s.contents)
-
-    def walk_directives(self, script=None):
-        """Iterate over all directives in the script."""
-        for d in self.walk_script(script):
-            if isinstance(d, scripts.Directive):
-                yield d
-
-    def walk_stagedirections(self, script=None):
-        """Iterate over all stage directions in the script."""
-        for d in self.walk_script(script):
-            if isinstance(d, scripts.StageDirection):
-                yield d
-
-    def script_so_far(self):
-        pos = self.stack[0][1]
-        return self.root_script.contents[:pos]
-
-    def binding_directives_seen(self):
-        """Return a list of event binding directives in the script so far."""
-        prev_directives = self.walk_directives(self.script_so_far())
-        return [d for d in prev_directives if d.name in ('allow', 'deny')]
+    def upcoming_music(self):
+        """Get the name of the next track the script will switch to.
+
+        Return None if the music won't change again.
+
+        """
+        from .music import music_name
+        code = self.program.code[self.stack[0][0]:self.program.root_end]
+        for d in code:
+            if isinstance(d, scripts.Directive) and d.name == 'music' \
+                    and d.data != music_name:
+                return d.data
+        return None
+
+    def find_binding_directive(self, uid):
+        """Get the binding directive with the given uid in the script so far.
+
+        Return None if it hasn't been seen yet.
+
+        """
+        return self.program.find_binding(uid, self.stack[0][0])
+
+    def last_binding_directive(self, action):
+        """Get the last binding directive for action in the script so far."""
+        return self.program.last_binding(action, self.stack[0][0])
 
     def wait_for(self, scene_action):
         """Queue a scene action and wait for it to finish before continuing."""
@@ -873,16 +947,21 @@ def load():
 
     scene.init_scene()
 
-    from .music import play_music
+    from .music import play_music, prefetch_music
 
-    if len(sys.argv) == 2:
-        if load_savegame(sys.argv[1]):
-            return
-    else:
-        if load_savegame():
-            return
-    player.wait_for(TitleBanner())
-    play_music('main')
+    with phase('save restore'):
+        if len(sys.argv) == 2:
+            restored = load_savegame(sys.argv[1])
+        else:
+            restored = load_savegame()
+    if not restored:
+        player.wait_for(TitleBanner())
+        play_music('main')
+    with phase('preload actors'):
+        scene.preload()
+    upcoming = player.upcoming_music()
+    if upcoming:
+        prefetch_music(upcoming)
 
 
 def on_mouse_down(pos, button):
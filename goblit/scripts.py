@@ -5,8 +5,14 @@ The entire script for the game is loaded from an RST-like file.
 
 """
 import re
+import io
+import os
+import sys
+import pickle
+import hashlib
+import threading
+from bisect import bisect_left
 from collections import namedtuple, Counter
-import os.path
 
 COMMENT_RE = re.compile(r'\s*#.*')
 DIRECTIVE_RE = re.compile(r'.. ([\w-]+)::\s*(.+)?')
@@ -23,6 +29,8 @@ TITLE_RE = re.compile(r'^(\w.*)')
 
 
 class Underline:
+    __slots__ = ('length', 'level')
+
     def __init__(self, s):
         self.length = len(s)
         if s[0] == '=':
@@ -32,8 +40,11 @@ class Underline:
 
 
 class Action:
+    __slots__ = ('verb', 'uid')
+
     def __init__(self, verb):
-        self.verb = verb
+        self.verb = sys.intern(verb)
+        self.uid = None
 
     def __repr__(self):
         return '{%s}' % self.verb
@@ -47,10 +58,24 @@ class StageDirection:
     as the 'action' attribute. This lookup happens at script preparation time.
 
     """
+    __slots__ = ('directions', 'action', 'bindings')
+
     def __init__(self, directions):
         self.directions = directions
         self.action = None
 
+        # The resolution of each direction, as returned by
+        # binding.resolve_stagedirection(), or None if it failed. Unlike the
+        # action, this can be cached.
+        self.bindings = None
+
+    def __getstate__(self):
+        return self.directions, self.bindings
+
+    def __setstate__(self, state):
+        self.directions, self.bindings = state
+        self.action = None
+
     def __repr__(self):
         return '[%s]' % ('; '.join(self.directions))
 
@@ -64,23 +89,38 @@ def make_stage_direction(instructions):
 
 Line = namedtuple('Line', 'character line')
 Title = namedtuple('SceneTitle', 'name level')
+SceneTitle = Title  # So that titles can be pickled
+
+
+def make_line(character, line):
+    return Line(sys.intern(character), line)
 
 
 class Directive:
-    indent = None
+    __slots__ = ('name', 'data', 'contents', 'indent', 'uid', 'args')
 
     def __init__(self, name, data='', contents=None):
-        self.name = name.strip()
+        self.name = sys.intern(name.strip())
         self.data = data
         self.contents = contents or []
+        self.indent = None
+        self.uid = None
+
+        # The arguments parsed from data, for directives that take them
+        # (see directives.prepare())
+        self.args = None
 
     def __repr__(self):
         return '<%s %r>' % (self.name, self.data)
 
 
+# The types of instruction that a parsed script is made of
+INSTRUCTION_TYPES = (Line, Title, Action, StageDirection, Directive)
+
+
 TOKEN_TYPES = [
     (DIRECTIVE_RE, Directive),
-    (LINE_RE, Line),
+    (LINE_RE, make_line),
     (ACTION_RE, Action),
     (STAGE_DIRECTION_RE, make_stage_direction),
     (UNDERLINE_RE, Underline),
@@ -92,12 +132,86 @@ SCRIPT_DIR = 'scripts'
 
 def read_lines(file):
     path = os.path.join(SCRIPT_DIR, file + '.txt')
-    with open(path, 'rU', encoding='utf8') as f:
+    with open(path, encoding='utf8') as f:
         yield from f
 
 
+def make_master_regex(token_types):
+    """Combine the token regexes into one regex that matches a whole line.
+
+    The line's indentation is captured in a group called 'indent'. Each
+    token type is wrapped in an outer group; after a match, lastindex is
+    the outer group of the token type that matched, and the token's own
+    groups follow it. Alternatives are tried in the order given, as
+    tokenize() used to try each regex in turn.
+
+    Return the regex and a dict mapping the index of each outer group to
+    the token class and the slice of groups to pass it.
+
+    """
+    alternatives = [r'(?P<comment>\s*#)']
+    for i, (regex, cls) in enumerate(token_types):
+        pattern = regex.pattern
+        if pattern.startswith('^'):
+            pattern = pattern[1:]
+        alternatives.append('(?P<token%d>%s)' % (i, pattern))
+    alternatives.append('(?P<title>%s)' % TITLE_RE.pattern.lstrip('^'))
+
+    # The lookahead makes the indentation atomic: if no token matches
+    # after the whole indentation, don't backtrack into it.
+    master = re.compile(
+        r'(?=(?P<indent>[ \t]*))(?P=indent)(?:%s)' % '|'.join(alternatives)
+    )
+    dispatch = {}
+    for i, (regex, cls) in enumerate(token_types):
+        group = master.groupindex['token%d' % i]
+        dispatch[group] = cls, slice(group, group + regex.groups)
+    return master, dispatch
+
+
+MASTER_RE, TOKEN_DISPATCH = make_master_regex(TOKEN_TYPES)
+COMMENT_GROUP = MASTER_RE.groupindex['comment']
+TITLE_GROUP = MASTER_RE.groupindex['title']
+
+
 def tokenize(lines):
     """Tokenise the lines."""
+    match = MASTER_RE.match
+    for lineno, l in enumerate(lines, start=1):
+        l = l.rstrip()
+        if not l:
+            continue
+        mo = match(l)
+        if not mo:
+            raise ParseError(
+                "Couldn't parse line %r (at line %d)" % (
+                    l.lstrip(' \t'), lineno
+                )
+            )
+        group = mo.lastindex
+        if group == COMMENT_GROUP:
+            continue
+
+        indents = mo.group(1)
+        if '\t' in indents:
+            indent = len(indents.expandtabs(8))
+        else:
+            indent = len(indents)
+
+        if group == TITLE_GROUP:
+            yield lineno, indent, mo.group(group)
+        else:
+            cls, args = TOKEN_DISPATCH[group]
+            yield lineno, indent, cls(*mo.groups()[args])
+
+
+def reference_tokenize(lines):
+    """Tokenise the lines by trying each regex in turn.
+
+    This was the original implementation of tokenize(); it is kept to
+    validate tokenize() against.
+
+    """
     for lineno, l in enumerate(lines, start=1):
         if COMMENT_RE.match(l) or not l.strip():
             continue
@@ -134,6 +248,7 @@ class Script:
 
     def __init__(self, contents=None):
         self.contents = contents or []
+        self.sources = []  # The names of the files the script was read from
 
     def __repr__(self):
         return repr(self.contents)
@@ -142,6 +257,15 @@ class Script:
 class ParseError(Exception):
     """Failed to parse the script"""
 
+    # The name of the file being parsed, set by iter_parse()
+    file = None
+
+    def __str__(self):
+        msg = super().__str__()
+        if self.file:
+            return '%s.txt: %s' % (self.file, msg)
+        return msg
+
 
 id_counts = Counter()
 
@@ -154,8 +278,34 @@ def make_uid(*partial_uid):
 
 def parse_file(file):
     """Parse a whole file."""
+    script = Script()
+    script.contents.extend(iter_parse(file, script.sources))
+    return script
+
+
+def iter_parse(file, sources=None):
+    """Parse a file, yielding each top-level instruction once it is complete.
 
-    directives = [Script()]
+    Files included at the top level are parsed when they are reached, so
+    that their contents stream out in place. The names of the files that
+    are read are appended to sources, if given.
+
+    A ParseError is given the name of the file in which it occurred.
+
+    """
+    try:
+        yield from _iter_parse(file, sources)
+    except ParseError as e:
+        if e.file is None:
+            e.file = file
+        raise
+
+
+def _iter_parse(file, sources):
+    root = Script()
+    directives = [root]
+    if sources is not None:
+        sources.append(file)
     lines = read_lines(file)
     last_indent = 0
     for lineno, indent, tok in tokenize(lines):
@@ -206,8 +356,12 @@ def parse_file(file):
 
         if isinstance(tok, Directive):
             if tok.name == 'include':
-                included = parse_file(tok.data)
-                top.contents.extend(included.contents)
+                if top is root:
+                    yield from root.contents
+                    root.contents.clear()
+                    yield from iter_parse(tok.data, sources)
+                else:
+                    top.contents.extend(iter_parse(tok.data, sources))
                 continue
             tok.uid = make_uid(tok.name, tok.data)
             directives.append(tok)
@@ -216,9 +370,440 @@ def parse_file(file):
 
         top.contents.append(tok)
 
-    return directives[0]
+        # Only the last top-level instruction can still change, by gaining
+        # contents or an underline; everything before it is complete
+        if len(root.contents) > 1:
+            yield from root.contents[:-1]
+            del root.contents[:-1]
+
+    yield from root.contents
+
+
+def iter_acts(instructions):
+    """Split a stream of top-level instructions into acts.
+
+    Each act is a list of instructions starting with a level 1 title, except
+    that anything before the first title belongs to the first act.
+
+    """
+    act = []
+    titled = False
+    for instruction in instructions:
+        if isinstance(instruction, Title) and instruction.level == 1:
+            if titled:
+                yield act
+                act = []
+            titled = True
+        act.append(instruction)
+    if act:
+        yield act
+
+
+def walk(instructions):
+    """Iterate over instructions, and the contents of directives among them."""
+    for instruction in instructions:
+        yield instruction
+        if isinstance(instruction, Directive):
+            yield from walk(instruction.contents)
+
+
+# Directives that bind a script to an action
+BINDING_DIRECTIVES = ('allow', 'deny')
+
+
+class Program:
+    """A script, flattened into an array of instructions.
+
+    Instructions are laid out in the order they appear in the script, with
+    each directive followed by its contents. ends[pc] is the index of the
+    instruction after the one at pc and all of its contents; this is where
+    execution continues after it, as a directive's contents are only played
+    when the directive plays them as a subscript.
+
+    The script is compiled an act at a time, as the acts are taken from
+    acts, an iterable of lists of top-level instructions (see iter_acts()).
+    Acts that have been played can be released again to save memory.
+
+    The program also indexes the directives by uid, and the positions of
+    the binding directives, so that we can find which bindings the script
+    has made up to any point without walking it.
+
+    """
+    def __init__(self, acts=()):
+        self.acts = iter(acts)
+        self.act_spans = []  # (start, end) of the code of each act loaded
+        self.code = []
+        self.ends = []
+        self.pcs = {}  # id(instruction) -> index in code
+        self.blocks = {}  # id(script or directive) -> (start, end, node)
+        self.uids = {}  # uid -> pc of directive
+        self.binding_pcs = []  # pcs of binding directives, in order
+        self.bindings = {}  # action name -> pcs of its binding directives
+        self.root_end = 0  # The end of the code of the last act loaded
+
+    def load_act(self):
+        """Compile the next act onto the end of the code.
+
+        Return the range of code for the act, or None if there are no more.
+
+        """
+        instructions = next(self.acts, None)
+        if instructions is None:
+            return None
+        start = len(self.code)
+        self.emit(instructions)
+        self.root_end = len(self.code)
+        self.act_spans.append((start, self.root_end))
+        return start, self.root_end
+
+    def release_act(self, act):
+        """Drop the code of an act that has been played, to free memory.
+
+        Binding directives are kept, with their contents, as they may still
+        be played after the script has moved on.
+
+        """
+        start, end = self.act_spans[act]
+        pc = start
+        while pc < end:
+            node = self.code[pc]
+            if node is None:
+                pc += 1
+                continue
+            if isinstance(node, Directive):
+                if node.name in BINDING_DIRECTIVES:
+                    pc = self.ends[pc]
+                    continue
+                self.blocks.pop(id(node), None)
+                if self.uids.get(node.uid) == pc:
+                    del self.uids[node.uid]
+            if self.pcs.get(id(node)) == pc:
+                del self.pcs[id(node)]
+            self.code[pc] = None
+            pc += 1
+
+    def compile(self, node):
+        """Append the contents of node to the code."""
+        start = self.emit(node.contents)
+
+        # Keep a reference to node so that its id isn't reused
+        self.blocks[id(node)] = start, len(self.code), node
+
+    def emit(self, instructions):
+        """Append instructions to the code, returning where they start."""
+        start = len(self.code)
+        for instruction in instructions:
+            pc = len(self.code)
+            self.code.append(instruction)
+            self.ends.append(None)
+            first = self.pcs.setdefault(id(instruction), pc) == pc
+            if isinstance(instruction, Directive):
+                if first:
+                    self.index_directive(instruction, pc)
+                self.compile(instruction)
+            self.ends[pc] = len(self.code)
+        return start
+
+    def index_directive(self, directive, pc):
+        self.uids.setdefault(directive.uid, pc)
+        if directive.name in BINDING_DIRECTIVES:
+            self.binding_pcs.append(pc)
+            self.bindings.setdefault(directive.data, []).append(pc)
+
+    def find_binding(self, uid, before):
+        """Get the binding directive with the given uid.
+
+        Return None if there is no such directive before pc before.
+
+        """
+        pc = self.uids.get(uid)
+        if pc is None or pc >= before:
+            return None
+        d = self.code[pc]
+        return d if d.name in BINDING_DIRECTIVES else None
+
+    def last_binding(self, action, before):
+        """Get the last binding directive for action before pc before."""
+        pcs = self.bindings.get(action)
+        if not pcs:
+            return None
+        i = bisect_left(pcs, before)
+        return self.code[pcs[i - 1]] if i else None
+
+    def block(self, node):
+        """Get the range of code for the contents of a script or directive.
+
+        Scripts that are not part of the program are compiled on first use.
+
+        """
+        try:
+            start, end, _ = self.blocks[id(node)]
+        except KeyError:
+            self.compile(node)
+            start, end, _ = self.blocks[id(node)]
+        return start, end
+
+    def span(self, instruction):
+        """Get the range of code for a single instruction in the program."""
+        pc = self.pcs[id(instruction)]
+        return pc, self.ends[pc]
+
+
+# Compiled scripts are cached here. The cache holds the parsed script, with
+# its uids and stage direction bindings, and is valid as long as the source
+# files and the set of stage direction bindings are unchanged.
+CACHE_DIR = os.path.join(SCRIPT_DIR, '__pycache__')
+CACHE_VERSION = 4
+
+
+def cache_path(file):
+    return os.path.join(CACHE_DIR, file + '.compiled')
+
+
+def cache_key(sources, bindings):
+    """Hash the given source files and binding fingerprint."""
+    h = hashlib.sha1(b'%d\n' % CACHE_VERSION)
+    h.update(bindings.encode('utf8'))
+    for source in sources:
+        h.update(b'\0' + source.encode('utf8') + b'\0')
+        with open(os.path.join(SCRIPT_DIR, source + '.txt'), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def load_compiled(file, bindings):
+    """Load a compiled script from the cache.
+
+    bindings is the fingerprint of the stage direction bindings (see
+    binding.fingerprint()). Return a list of the acts of the script, each
+    pickled, or None if there is no valid cached script.
+
+    """
+    try:
+        with open(cache_path(file), 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        f = io.BytesIO(data)
+        key, sources = pickle.load(f)
+        if key != cache_key(sources, bindings):
+            return None
+        acts, counts = pickle.load(f)
+    except Exception:
+        return None
+    id_counts.clear()
+    id_counts.update(counts)
+    return acts
+
+
+def save_compiled(file, sources, acts, bindings):
+    """Write a compiled script to the cache.
+
+    sources are the files the script was read from and acts is a list of its
+    acts, each pickled once its stage directions have been bound.
+
+    Failure to write the cache is not an error; it just won't be used.
+
+    """
+    key = cache_key(sources, bindings)
+    data = pickle.dumps((key, sources), pickle.HIGHEST_PROTOCOL)
+    data += pickle.dumps((acts, id_counts), pickle.HIGHEST_PROTOCOL)
+    path = cache_path(file)
+    tmp = path + '.tmp'
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError as e:
+        print("Couldn't write script cache:", e)
+
+
+class ActReader:
+    """Read the acts of a script, one at a time.
+
+    Acts are held pickled, which takes far less memory than the parsed
+    instructions, and are only unpickled when they are needed. They are read
+    from the cache if it is valid; otherwise the script is parsed on a worker
+    thread, so that the acts after the first are parsed while it plays, and
+    the cache is written once the whole script has been parsed. Once the
+    cache has been written, or if it was read, each act is dropped when it
+    has been read, so only the acts still to come are held.
+
+    An error in parsing is printed when it happens, and raised again when
+    the act in which it occurred is read.
+
+    prepare, if given, is called on the worker thread with the instructions
+    of each act that is parsed, before it is pickled. This is the place to
+    resolve stage direction bindings, so that they are cached too.
+
+    """
+    def __init__(self, file, bindings, prepare=None):
+        self.file = file
+        self.bindings = bindings
+        self.prepare = prepare
+        self.read = 0  # The number of acts read so far
+        self.error = None
+        self.lock = threading.Condition()
+        self.blobs = load_compiled(file, bindings)
+        self.compiled = self.blobs is not None
+        self.parsed = self.compiled
+
+        # Whether the acts that are read must be kept to write the cache
+        self.saving = not self.compiled
+        if not self.compiled:
+            self.blobs = []
+            threading.Thread(target=self.parse, daemon=True).start()
+
+    def parse(self):
+        """Parse the script, pickling each act as it is completed."""
+        sources = []
+        try:
+            for act in iter_acts(iter_parse(self.file, sources)):
+                if self.prepare:
+                    self.prepare(act)
+                blob = pickle.dumps(act, pickle.HIGHEST_PROTOCOL)
+                with self.lock:
+                    self.blobs.append(blob)
+                    self.lock.notify_all()
+        except Exception as e:
+            print("Failed to parse script:", e)
+            self.error = e
+        finally:
+            with self.lock:
+                self.parsed = True
+                self.lock.notify_all()
+        if not self.error:
+            save_compiled(self.file, sources, self.blobs, self.bindings)
+        with self.lock:
+            self.saving = False
+            for i in range(self.read):
+                self.blobs[i] = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """Get the instructions of the next act, waiting for it if need be."""
+        with self.lock:
+            self.lock.wait_for(
+                lambda: self.read < len(self.blobs) or self.parsed
+            )
+            if self.read == len(self.blobs):
+                if self.error:
+                    raise self.error
+                raise StopIteration
+            blob = self.blobs[self.read]
+            if not self.saving:
+                self.blobs[self.read] = None
+            self.read += 1
+        return pickle.loads(blob)
 
 
 if __name__ == '__main__':
-    script = parse_file('script')
-    print(script)
+    import time
+
+    def token_repr(tok):
+        lineno, indent, t = tok
+        if not isinstance(t, (str, tuple)):
+            t = {k: getattr(t, k) for k in type(t).__slots__}
+        return lineno, indent, type(tok[2]).__name__, t
+
+    if sys.argv[1:] == ['--check-tokenizer']:
+        # Validate tokenize() against reference_tokenize() on every
+        # script, then compare their speed on a large synthetic script
+        sources = sorted(
+            f[:-4] for f in os.listdir(SCRIPT_DIR) if f.endswith('.txt')
+        )
+        all_lines = []
+        for source in sources:
+            lines = list(read_lines(source))
+            all_lines.extend(lines)
+            new = [token_repr(t) for t in tokenize(lines)]
+            old = [token_repr(t) for t in reference_tokenize(lines)]
+            assert new == old, "Tokenizers disagree on %s" % source
+            print("%-20s %5d tokens match" % (source, len(new)))
+
+        synthetic = all_lines * 50
+        for func in (reference_tokenize, tokenize):
+            start = time.perf_counter()
+            for _ in func(synthetic):
+                pass
+            t = time.perf_counter() - start
+            print("%-20s %9.0f lines/s" % (
+                func.__name__, len(synthetic) / t
+            ))
+    elif sys.argv[1:] == ['--memory']:
+        # Report the memory taken by the parsed script, as measured by
+        # tracemalloc, and the size of each kind of node. The script is
+        # parsed with the node classes as they are, with __slots__, and with
+        # copies of them that keep their attributes in a __dict__ instead.
+        import tracemalloc
+        from collections import defaultdict
+
+        def dict_backed(cls):
+            """Copy a slotted class, without its __slots__."""
+            ns = {
+                k: v for k, v in vars(cls).items()
+                if k != '__slots__' and k not in cls.__slots__
+            }
+            return type(cls.__name__, cls.__bases__, ns)
+
+        def measure():
+            """Parse the script, returning its size and the size of nodes.
+
+            The size of nodes is a dict mapping each kind of node to the
+            number of nodes and their mean size.
+
+            """
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            script = parse_file('script')
+            size = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+
+            nodes = defaultdict(list)
+            for node in walk(script.contents):
+                nodes[type(node).__name__].append(node)
+            sizes = {}
+            for name, instances in nodes.items():
+                total = sum(
+                    sys.getsizeof(n) +
+                    (sys.getsizeof(n.__dict__) if hasattr(n, '__dict__')
+                     else 0)
+                    for n in instances
+                )
+                sizes[name] = len(instances), total / len(instances)
+            return size, sizes
+
+        # Parse once first, so that neither measurement includes warming up
+        sources = parse_file('script').sources
+        lines = sum(len(list(read_lines(s))) for s in sources)
+        slotted, slotted_nodes = measure()
+
+        copies = {
+            cls: dict_backed(cls)
+            for cls in (Underline, Action, StageDirection, Directive)
+        }
+        for cls, copy in copies.items():
+            globals()[cls.__name__] = copy
+        for group, (cls, args) in TOKEN_DISPATCH.items():
+            TOKEN_DISPATCH[group] = copies.get(cls, cls), args
+        unslotted, unslotted_nodes = measure()
+
+        print("%-16s %5s %11s %11s" % ('', 'nodes', 'unslotted', 'slotted'))
+        for name, (count, size) in sorted(slotted_nodes.items()):
+            print("%-16s %5d %9.1f B %9.1f B" % (
+                name, count, unslotted_nodes[name][1], size
+            ))
+        print("%-16s %5s %8.1f KB %8.1f KB" % (
+            'whole script', '', unslotted / 1024, slotted / 1024
+        ))
+        print("%-16s %5s %9.1f B %9.1f B" % (
+            'per line', '', unslotted / lines, slotted / lines
+        ))
+        print("%d lines" % lines)
+    else:
+        script = parse_file('script')
+        print(script)
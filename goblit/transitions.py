@@ -32,7 +32,7 @@ class Move:
 
     def skip(self):
         """Skip to the end of the move."""
-        self.actor.sprite.pos = self.goal
+        self.actor.pos = self.goal
         self.actor.sprite.play('default')
 
     def update(self, dt):
@@ -55,7 +55,7 @@ class Move:
 
         x = round(frac * tx + (1 - frac) * x)
         y = round(frac * ty + (1 - frac) * y)
-        self.actor.sprite.pos = x, y
+        self.actor.pos = x, y
         self.last_dt = dt
         if tx > x:
             self.actor.sprite.dir = 'right'
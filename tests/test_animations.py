@@ -0,0 +1,57 @@
+import pygame
+from pygame.transform import flip
+
+from goblit.animations import Animation, Sequence, Frame, loop
+
+
+class RecordingScreen:
+    """A stand-in for the screen that records what is blitted where."""
+    def __init__(self):
+        self.blits = []
+
+    def blit(self, surf, pos):
+        self.blits.append((surf, pos))
+
+
+def make_sprite(w, h):
+    """Make a sprite whose pixels are all different, so flips show."""
+    surf = pygame.Surface((w, h), pygame.SRCALPHA)
+    for x in range(w):
+        for y in range(h):
+            surf.set_at((x, y), (x * 10 % 256, y * 10 % 256, 0, 255))
+    return surf
+
+
+def test_mirrored_blit_matches_flipped_sprite_at_same_offset():
+    sprites = [make_sprite(13, 7), make_sprite(5, 9)]
+    offsets = [(-6, -40), (3, 2)]
+    pos = (100, 200)
+    for sprite, offset in zip(sprites, offsets):
+        frame = Frame(sprite, offset)
+        anim = Animation({'default': Sequence([frame], loop)})
+        instance = anim.create_instance(pos)
+        instance.dir = 'right'
+
+        screen = RecordingScreen()
+        instance.draw(screen)
+        instance.draw(screen)  # The second draw comes from the cache
+
+        # Before mirrored frames were cached, the flipped sprite was drawn
+        # at the unflipped offset
+        expected = flip(sprite, True, False)
+        expected_pos = (pos[0] + offset[0], pos[1] + offset[1])
+        for surf, blit_pos in screen.blits:
+            assert blit_pos == expected_pos
+            assert surf.get_size() == expected.get_size()
+            assert pygame.image.tostring(surf, 'RGBA') == \
+                pygame.image.tostring(expected, 'RGBA')
+
+
+def test_left_facing_blit_is_unchanged():
+    sprite = make_sprite(8, 4)
+    anim = Animation({'default': Sequence([Frame(sprite, (-4, -4))], loop)})
+    instance = anim.create_instance((10, 10))
+    instance.dir = 'left'
+    screen = RecordingScreen()
+    instance.draw(screen)
+    assert screen.blits == [(sprite, (6, 6))]
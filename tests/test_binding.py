@@ -0,0 +1,176 @@
+import pytest
+
+from goblit import binding
+from goblit.actions import MoveTo, ParallelAction, Synchronous
+from goblit.binding import Binding, ParallelBinding
+from goblit.clock import Clock
+
+
+class StubSprite:
+    def __init__(self, pos):
+        self.pos = pos
+
+    def play(self, sequence_name):
+        pass
+
+
+class StubActor:
+    def __init__(self, name, pos):
+        self.name = name
+        self.sprite = StubSprite(pos)
+
+    @property
+    def pos(self):
+        return self.sprite.pos
+
+    @pos.setter
+    def pos(self, pos):
+        self.sprite.pos = pos
+
+
+class StubScene:
+    """Just enough of a scene to play MoveTo actions."""
+    def __init__(self, points):
+        self.clock = Clock()
+        self.points = points
+        self.actors = {
+            'GOBLIT': StubActor('GOBLIT', (0, 0)),
+            'RALPH': StubActor('RALPH', (0, 0)),
+        }
+
+    def get_actor(self, name):
+        return self.actors[name]
+
+    def lookup_position(self, goal):
+        return self.points[goal]
+
+    def get_route(self, actor, pos, strict=False, exclusive=False):
+        return [actor.pos, pos]
+
+
+def test_template_is_played_again_and_skipped():
+    """A template skipped on its second play moves to the current goals."""
+    b = Binding(
+        lambda scene: MoveTo('GOBLIT', 'A') >> MoveTo('GOBLIT', 'B')
+    )
+    scene = StubScene({'A': (100, 0), 'B': (100, 100)})
+    finished = []
+
+    action = b(scene)
+    action.on_finish = lambda: finished.append(1)
+    action.play(scene)
+    for _ in range(10):
+        scene.clock.tick(0.5)
+    assert finished == [1]
+    assert scene.actors['GOBLIT'].pos == (100, 100)
+
+    # The points have moved; the second move has not started when the
+    # chain is skipped, so it must not reuse the route from the first play
+    scene.points = {'A': (200, 0), 'B': (200, 200)}
+    again = b(scene)
+    assert again is action
+    again.play(scene)
+    scene.clock.tick(0.1)
+    again.skip(scene)
+    assert scene.actors['GOBLIT'].pos == (200, 200)
+
+
+def test_parallel_template_skips_all_actions_again():
+    b = Binding(
+        lambda scene: ParallelAction(
+            MoveTo('GOBLIT', 'A'),
+            MoveTo('RALPH', 'B'),
+        )
+    )
+    scene = StubScene({'A': (100, 0), 'B': (0, 100)})
+    action = b(scene)
+    action.play(scene)
+    action.skip(scene)
+    assert scene.actors['GOBLIT'].pos == (100, 0)
+    assert scene.actors['RALPH'].pos == (0, 100)
+
+    scene.points = {'A': (300, 0), 'B': (0, 300)}
+    again = b(scene)
+    again.skip(scene)
+    assert scene.actors['GOBLIT'].pos == (300, 0)
+    assert scene.actors['RALPH'].pos == (0, 300)
+
+
+def test_replaying_a_template_mid_move_leaves_one_updater():
+    b = Binding(lambda scene: MoveTo('GOBLIT', 'A'))
+    scene = StubScene({'A': (1000, 0)})
+    action = b(scene)
+    action.play(scene)
+    scene.clock.tick(0.1)
+    # The clock only holds updaters weakly; keep the first move alive, as
+    # anything else that refers to it would
+    first = action.transition
+
+    again = b(scene)
+    again.play(scene)
+    assert again.transition is not first
+    updaters = [r for r in scene.clock._each_tick if r() is not None]
+    assert len(updaters) == 1
+
+
+class Record(Synchronous):
+    """An action that records when it is played."""
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+
+    def do(self, scene):
+        self.log.append(self.name)
+
+
+@pytest.fixture
+def log(monkeypatch):
+    """Register some stage directions that log what they do.
+
+    The registry is replaced for the test, so these don't leak into others.
+
+    """
+    monkeypatch.setattr(binding, 'STAGE_DIRECTIONS', [])
+    monkeypatch.setattr(binding, '_resolved', {})
+    monkeypatch.setattr(binding, '_dispatch', None)
+    log = []
+
+    @binding.stagedirection('* waves')
+    def waves(scene, character):
+        return Record(log, character + ' waves')
+
+    @binding.stagedirection('* bows')
+    def bows(scene, character):
+        return Record(log, character + ' bows')
+
+    @binding.stagedirection('* shouts')
+    def shouts(scene, character):
+        log.append(character + ' shouts')  # Acts directly
+
+    return log
+
+
+def play_direction(directions, log):
+    """Play a multi-part stage direction twice, returning what each did."""
+    b = ParallelBinding([binding.lookup_stagedirection(d) for d in directions])
+    scene = StubScene({})
+    plays = []
+    for _ in range(2):
+        finished = []
+        action = b(scene)
+        action.on_finish = lambda: finished.append(1)
+        action.play(scene)
+        assert finished == [1]
+        plays.append(sorted(log))
+        log.clear()
+    return plays
+
+
+def test_multi_part_direction_plays_every_part_again(log):
+    plays = play_direction(['GOBLIT waves', 'RALPH bows'], log)
+    assert plays == [['GOBLIT waves', 'RALPH bows']] * 2
+
+
+def test_multi_part_direction_with_a_direct_part_plays_again(log):
+    plays = play_direction(['GOBLIT waves', 'RALPH shouts'], log)
+    assert plays == [['GOBLIT waves', 'RALPH shouts']] * 2
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from goblit import directives
+from goblit.directives import Craft, Rename
+from goblit.errors import ScriptError
+from goblit.scripts import Directive
+
+ROOT = os.path.join(os.path.dirname(__file__), os.pardir)
+
+
+@pytest.fixture(autouse=True)
+def in_root(monkeypatch):
+    """Items are found by their icons, relative to the root of the game."""
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.mark.parametrize('name, data, args', [
+    ('gain', 'MUG', 'MUG'),
+    ('lose', 'KETTLE', 'KETTLE'),
+    ('craft', 'MUG + KETTLE -> CUP OF TEA',
+     Craft(('MUG', 'KETTLE'), ('CUP OF TEA',))),
+    ('craft', 'MUG->CUP OF TEA', Craft(('MUG',), ('CUP OF TEA',))),
+    ('rename', 'GOBLIT -> SIR GOBLIT', Rename('GOBLIT', 'SIR GOBLIT')),
+    ('rename', 'MUG -> CUP', Rename('MUG', 'CUP')),
+])
+def test_parsers_parse_good_data(name, data, args):
+    assert directives.PARSERS[name](data) == args
+
+
+@pytest.mark.parametrize('name, data', [
+    ('gain', 'NO SUCH THING'),
+    ('lose', 'TEAPOT OF DOOM'),
+    ('craft', 'MUG + KETTLE'),
+    ('craft', 'MUG + NO SUCH THING -> CUP OF TEA'),
+    ('craft', ' + -> CUP OF TEA'),
+    ('rename', 'GOBLIT'),
+    ('rename', 'NOBODY -> SOMEBODY'),
+])
+def test_parsers_reject_bad_data(name, data):
+    with pytest.raises(ScriptError):
+        directives.PARSERS[name](data)
+
+
+def test_prepare_parses_arguments_ahead_of_time():
+    d = Directive('craft', 'MUG + KETTLE -> CUP OF TEA')
+    directives.prepare(d)
+    assert d.args == Craft(('MUG', 'KETTLE'), ('CUP OF TEA',))
+    assert directives.get_args(d) is d.args
+
+
+def test_prepare_reports_bad_data_and_play_raises_it(capsys):
+    d = Directive('gain', 'NO SUCH THING')
+    directives.prepare(d)
+    assert d.args is None
+    assert 'No such item NO SUCH THING' in capsys.readouterr().out
+    with pytest.raises(ScriptError):
+        directives.get_args(d)
+
+
+def test_prepare_ignores_directives_without_parsers():
+    d = Directive('music', 'main')
+    directives.prepare(d)
+    assert d.args is None
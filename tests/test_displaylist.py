@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from goblit.displaylist import DisplayList
+
+
+class Obj:
+    def __init__(self, z, name=None):
+        self.z = z
+        self.name = name
+
+    def __repr__(self):
+        return 'Obj(%r, %r)' % (self.z, self.name)
+
+
+def zs(dl):
+    return [o.z for o in dl]
+
+
+def test_objects_are_kept_in_z_order():
+    objs = [Obj(z) for z in (5, 1, 3, 9, 0)]
+    dl = DisplayList(objs)
+    assert zs(dl) == [0, 1, 3, 5, 9]
+    assert len(dl) == 5
+    assert all(o in dl for o in objs)
+
+
+def test_equal_z_keeps_order_added():
+    a, b, c = Obj(1, 'a'), Obj(1, 'b'), Obj(1, 'c')
+    dl = DisplayList([a, b, c])
+    assert list(dl) == [a, b, c]
+
+
+@pytest.mark.parametrize('z', [-1, 2, 4, 6, 100])
+def test_reposition_moves_object_to_its_new_place(z):
+    objs = [Obj(z) for z in (0, 3, 5)]
+    dl = DisplayList(objs)
+    objs[1].z = z
+    dl.reposition(objs[1])
+    assert zs(dl) == sorted([0, 5, z])
+
+
+def test_reposition_among_equals_goes_after_them():
+    a, b, c = Obj(1, 'a'), Obj(2, 'b'), Obj(2, 'c')
+    dl = DisplayList([a, b, c])
+    a.z = 2
+    dl.reposition(a)
+    assert list(dl) == [b, c, a]
+
+
+def test_reposition_ignores_objects_not_in_the_list():
+    dl = DisplayList([Obj(1)])
+    dl.reposition(Obj(0))
+    assert zs(dl) == [1]
+
+
+def test_random_moves_keep_z_order():
+    random.seed(0)
+    objs = [Obj(random.randrange(100)) for _ in range(50)]
+    dl = DisplayList(objs)
+    for _ in range(500):
+        o = random.choice(objs)
+        o.z = max(0, min(99, o.z + random.randint(-10, 10)))
+        dl.reposition(o)
+        assert zs(dl) == sorted(zs(dl))
+    assert sorted(dl, key=id) == sorted(objs, key=id)
+
+
+def test_remove_after_moving():
+    objs = [Obj(z) for z in (0, 3, 5)]
+    dl = DisplayList(objs)
+    objs[0].z = 4
+    dl.reposition(objs[0])
+    dl.remove(objs[0])
+    assert zs(dl) == [3, 5]
+    assert objs[0] not in dl
+    with pytest.raises(ValueError):
+        dl.remove(objs[0])
+
+
+def test_object_added_twice_moves_both_entries():
+    o = Obj(2)
+    dl = DisplayList([Obj(1), o, Obj(3)])
+    dl.append(o)
+    o.z = 5
+    dl.reposition(o)
+    assert list(dl)[-2:] == [o, o]
+    dl.remove(o)
+    assert o in dl
+    dl.remove(o)
+    assert o not in dl
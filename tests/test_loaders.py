@@ -0,0 +1,72 @@
+from goblit.loaders import AssetCache
+
+
+def fill(cache, keys, size=10, pin=False):
+    for k in keys:
+        cache.get(k, lambda: k.upper(), size=lambda asset: size, pin=pin)
+
+
+def test_hits_do_not_reload():
+    cache = AssetCache(budget=100)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return 'asset'
+
+    assert cache.get('a', load, size=len) == 'asset'
+    assert cache.get('a', load, size=len) == 'asset'
+    assert loads == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_are_evicted_to_fit_budget():
+    cache = AssetCache(budget=30)
+    fill(cache, 'abc')
+    fill(cache, 'a')  # a is now the most recently used
+    fill(cache, 'd')
+    assert list(cache.assets) == ['c', 'a', 'd']
+    assert cache.resident == 30
+    assert cache.evictions == 1
+
+
+def test_resident_size_never_exceeds_budget():
+    cache = AssetCache(budget=45)
+    for i in range(20):
+        fill(cache, [str(i)], size=i + 1)
+        assert cache.resident <= cache.budget
+        assert cache.resident == sum(e[1] for e in cache.assets.values())
+
+
+def test_pinned_assets_are_never_evicted():
+    cache = AssetCache(budget=30)
+    fill(cache, 'ab', pin=True)
+    fill(cache, 'cdefg')
+    assert 'a' in cache and 'b' in cache
+    assert cache.resident <= cache.budget
+
+
+def test_pinned_assets_may_exceed_budget():
+    cache = AssetCache(budget=20)
+    fill(cache, 'abc', pin=True)
+    assert list(cache.assets) == ['a', 'b', 'c']
+    fill(cache, 'd')
+    assert 'd' not in cache
+    assert cache.resident == 30
+
+
+def test_pinning_on_a_hit():
+    cache = AssetCache(budget=20)
+    fill(cache, 'ab')
+    fill(cache, 'a', pin=True)
+    fill(cache, 'b')  # An unpinned hit doesn't unpin
+    fill(cache, 'cd')
+    assert 'a' in cache and 'b' not in cache and 'c' not in cache
+
+
+def test_unpinning_evicts_down_to_budget():
+    cache = AssetCache(budget=20)
+    fill(cache, 'abc', pin=True)
+    cache.unpin('a')
+    assert list(cache.assets) == ['b', 'c']
+    assert cache.resident == 20
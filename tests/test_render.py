@@ -0,0 +1,94 @@
+import pygame
+import pytest
+
+from goblit.render import DirtyRenderer, DrawList, merge_rects
+
+SIZE = (200, 150)
+
+
+def sprite(color, size=(20, 20)):
+    surf = pygame.Surface(size)
+    surf.fill(color)
+    return surf
+
+
+class Stage:
+    """A scene of sprites drawn in order over a background."""
+    def __init__(self):
+        self.red = sprite((255, 0, 0))
+        self.blue = sprite((0, 0, 255))
+        self.objects = [[self.red, (10, 10)], [self.blue, (20, 20)]]
+
+    def draw(self, screen):
+        screen.fill((0, 40, 0))
+        screen.fill((80, 80, 80), pygame.Rect(0, 100, 200, 50))
+        for surf, pos in self.objects:
+            screen.blit(surf, pos)
+
+
+@pytest.fixture
+def stage():
+    return Stage()
+
+
+def render(stage, renderer):
+    """Draw a frame with renderer, checking it against a full redraw."""
+    dirty = renderer.draw(stage.draw)
+    expected = pygame.Surface(SIZE)
+    stage.draw(expected)
+    assert (pygame.image.tostring(renderer.screen, 'RGB') ==
+            pygame.image.tostring(expected, 'RGB'))
+    return dirty
+
+
+def test_first_frame_is_drawn_in_full(stage):
+    r = DirtyRenderer(pygame.Surface(SIZE))
+    assert render(stage, r) == [pygame.Rect((0, 0), SIZE)]
+
+
+def test_unchanged_frame_redraws_nothing(stage):
+    r = DirtyRenderer(pygame.Surface(SIZE))
+    render(stage, r)
+    assert render(stage, r) == []
+
+
+def test_moving_matches_full_redraw(stage):
+    r = DirtyRenderer(pygame.Surface(SIZE))
+    render(stage, r)
+    for pos in [(25, 20), (60, 90), (190, 140), (-10, 95)]:
+        stage.objects[1][1] = pos
+        dirty = render(stage, r)
+        assert dirty != [r.screen.get_rect()]
+
+
+def test_restacking_matches_full_redraw(stage):
+    """Swapping overlapping sprites changes only their stacking order."""
+    r = DirtyRenderer(pygame.Surface(SIZE))
+    render(stage, r)
+    stage.objects.reverse()
+    dirty = render(stage, r)
+    assert dirty == [pygame.Rect(10, 10, 30, 30)]
+
+
+def test_invalidate_redraws_in_full(stage):
+    r = DirtyRenderer(pygame.Surface(SIZE))
+    render(stage, r)
+    r.screen.fill((255, 255, 255))
+    r.invalidate()
+    assert render(stage, r) == [r.screen.get_rect()]
+
+
+def test_diff_reports_old_and_new_places():
+    surf = sprite((255, 0, 0))
+    before = DrawList(SIZE)
+    before.blit(surf, (0, 0))
+    after = DrawList(SIZE)
+    after.blit(surf, (50, 0))
+    assert sorted(map(tuple, after.diff(before))) == [
+        (0, 0, 20, 20), (50, 0, 20, 20)
+    ]
+
+
+def test_merge_rects_joins_overlapping_rects():
+    merged = merge_rects([(0, 0, 10, 10), (50, 50, 5, 5), (5, 5, 10, 10)])
+    assert sorted(map(tuple, merged)) == [(0, 0, 15, 15), (50, 50, 5, 5)]
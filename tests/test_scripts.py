@@ -0,0 +1,206 @@
+import os
+import pickle
+
+import pytest
+
+from goblit import scripts
+
+SCRIPT_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'scripts')
+
+
+def token_repr(tok):
+    """Get a comparable representation of a token."""
+    lineno, indent, t = tok
+    if not isinstance(t, (str, tuple)):
+        t = {k: getattr(t, k) for k in type(t).__slots__}
+    return lineno, indent, type(tok[2]).__name__, t
+
+
+@pytest.fixture
+def script_dir(monkeypatch):
+    monkeypatch.setattr(scripts, 'SCRIPT_DIR', SCRIPT_DIR)
+
+
+@pytest.mark.parametrize('source', sorted(
+    f[:-4] for f in os.listdir(SCRIPT_DIR) if f.endswith('.txt')
+))
+def test_tokenize_matches_reference(script_dir, source):
+    lines = list(scripts.read_lines(source))
+    new = [token_repr(t) for t in scripts.tokenize(lines)]
+    old = [token_repr(t) for t in scripts.reference_tokenize(lines)]
+    assert new == old
+
+
+def test_tokenize_reports_unparseable_line():
+    with pytest.raises(scripts.ParseError) as e:
+        list(scripts.tokenize(['GOBLIT: Hello.\n', '  ???\n']))
+    assert 'at line 2' in str(e.value)
+
+
+SCRIPT = """\
+Act 1
+=====
+
+GOBLIT: Hello.
+.. allow:: Look at KETTLE
+
+    GOBLIT: It's a kettle.
+
+.. choose-all::
+
+    .. choice:: Hi.
+
+        GOBLIT: Hi.
+
+{Speak to WIZARD TOX}
+
+Act 2
+=====
+
+GOBLIT: Goodbye.
+"""
+
+
+def write_script(directory, name, text):
+    with open(os.path.join(str(directory), name + '.txt'), 'w') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def tmp_scripts(tmp_path, monkeypatch):
+    """Read scripts from, and cache them in, a temporary directory."""
+    monkeypatch.setattr(scripts, 'SCRIPT_DIR', str(tmp_path))
+    monkeypatch.setattr(scripts, 'CACHE_DIR', str(tmp_path / 'cache'))
+    return tmp_path
+
+
+def load_program(directory, text=SCRIPT):
+    write_script(directory, 'script', text)
+    acts = scripts.iter_acts(scripts.iter_parse('script'))
+    return scripts.Program(acts)
+
+
+def test_program_lays_out_directives_before_their_contents(tmp_scripts):
+    program = load_program(tmp_scripts)
+    assert program.load_act() == (0, 8)
+    code = program.code
+    names = [getattr(i, 'name', None) for i in code]
+    allow = names.index('allow')
+    choose = names.index('choose-all')
+
+    # Each directive is followed by its contents, and ends after them
+    assert code[allow + 1] == scripts.Line('GOBLIT', "It's a kettle.")
+    assert program.ends[allow] == choose
+    assert program.block(code[allow]) == (allow + 1, choose)
+    assert program.span(code[allow]) == (allow, choose)
+
+    choice = code[choose + 1]
+    assert choice.name == 'choice'
+    assert program.block(code[choose]) == (choose + 1, choose + 3)
+    assert program.block(choice) == (choose + 2, choose + 3)
+    assert isinstance(code[program.ends[choose]], scripts.Action)
+
+
+def test_program_loads_acts_in_turn(tmp_scripts):
+    program = load_program(tmp_scripts)
+    first = program.load_act()
+    second = program.load_act()
+    assert second == (first[1], first[1] + 2)
+    assert program.load_act() is None
+    assert program.code[second[0]] == scripts.Title('Act 2', 1)
+
+
+
+def compile_script(name):
+    """Parse a script into pickled acts, as ActReader does."""
+    sources = []
+    acts = [
+        pickle.dumps(act, pickle.HIGHEST_PROTOCOL)
+        for act in scripts.iter_acts(scripts.iter_parse(name, sources))
+    ]
+    return sources, acts
+
+
+def test_compiled_script_round_trips_through_cache(tmp_scripts):
+    write_script(tmp_scripts, 'script', '.. include:: defs\n\n' + SCRIPT)
+    write_script(tmp_scripts, 'defs', '.. allow:: Look at MUG\n')
+    sources, acts = compile_script('script')
+    assert sources == ['script', 'defs']
+
+    assert scripts.load_compiled('script', 'bindings') is None
+    scripts.save_compiled('script', sources, acts, 'bindings')
+    assert scripts.load_compiled('script', 'bindings') == acts
+
+
+@pytest.mark.parametrize('change', ['script', 'defs', 'bindings'])
+def test_cache_is_invalidated_by_changes(tmp_scripts, change):
+    write_script(tmp_scripts, 'script', '.. include:: defs\n\n' + SCRIPT)
+    write_script(tmp_scripts, 'defs', '.. allow:: Look at MUG\n')
+    sources, acts = compile_script('script')
+    scripts.save_compiled('script', sources, acts, 'bindings')
+
+    bindings = 'bindings'
+    if change == 'bindings':
+        bindings = 'other bindings'
+    elif change == 'defs':
+        write_script(tmp_scripts, 'defs', '.. allow:: Look at CUP\n')
+    else:
+        write_script(
+            tmp_scripts, 'script',
+            '.. include:: defs\n\n' + SCRIPT + 'GOBLIT: Again.\n'
+        )
+    assert scripts.load_compiled('script', bindings) is None
+
+
+def test_release_act_keeps_binding_directives(tmp_scripts):
+    program = load_program(tmp_scripts)
+    start, end = program.load_act()
+    program.load_act()
+    allow = program.bindings['Look at KETTLE'][0]
+    directive = program.code[allow]
+
+    program.release_act(0)
+    kept = [
+        pc for pc in range(start, end) if program.code[pc] is not None
+    ]
+    # The binding directive and its contents are kept
+    assert kept == [allow, allow + 1]
+    assert program.find_binding(directive.uid, end) is directive
+    assert program.last_binding('Look at KETTLE', end) is directive
+    assert program.block(directive) == (allow + 1, allow + 2)
+
+    # The rest of the act is gone, and so are its indexes
+    assert not any(
+        pc in range(start, end) and pc != allow
+        for pc in program.uids.values()
+    )
+
+
+def test_act_reader_surfaces_parse_errors(tmp_scripts, capsys):
+    write_script(
+        tmp_scripts, 'script',
+        SCRIPT + '  GOBLIT: Unexpectedly indented.\n'
+    )
+    reader = scripts.ActReader('script', 'bindings')
+    assert next(reader)[0] == scripts.Title('Act 1', 1)
+    with pytest.raises(scripts.ParseError) as e:
+        next(reader)
+    message = 'script.txt: Unexpected indent (at line 21)'
+    assert str(e.value) == message
+
+    # It was printed by the worker as soon as it happened
+    assert message in capsys.readouterr().out
+
+    # A script that failed to parse isn't cached
+    assert scripts.load_compiled('script', 'bindings') is None
+
+
+def test_act_reader_drops_acts_from_the_cache_once_read(tmp_scripts):
+    write_script(tmp_scripts, 'script', SCRIPT)
+    sources, acts = compile_script('script')
+    scripts.save_compiled('script', sources, acts, 'bindings')
+
+    reader = scripts.ActReader('script', 'bindings')
+    assert reader.compiled
+    assert [pickle.dumps(a, pickle.HIGHEST_PROTOCOL) for a in reader] == acts
+    assert reader.blobs == [None, None]